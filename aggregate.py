@@ -0,0 +1,270 @@
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from config import RESULTS_DIR, AGGREGATE_STORE_PATH
+from checkpoint import CHECKPOINT_FILE
+from report import (
+    RESULTS_JSONL_FILE,
+    iter_result_rows,
+    load_run_results,
+    read_result_rows,
+)
+
+# numeric/flag columns of results.jsonl kept in the store, responses stay in
+# the run folders
+ROW_COLUMNS = [
+    "run_id",
+    "model_key",
+    "dilemma_id",
+    "dilemma_title",
+    "persona",
+    "judge_rating",
+    "is_winner",
+    "winner_fallback",
+    "keyword_score",
+    "polarity",
+    "subjectivity",
+    "word_count",
+    "dilemma_elapsed_s",
+]
+
+
+def _run_started_at(run_id):
+    # run_<model>_<YYYYmmdd>_<HHMMSS>, see create_output_dir
+    try:
+        stamp = "_".join(run_id.split("_")[-2:])
+        return datetime.strptime(stamp, "%Y%m%d_%H%M%S").isoformat()
+    except ValueError:
+        return None
+
+
+def _run_source(run_dir):
+    """Returns (path, mtime) of the file a run gets ingested from, or None."""
+    for name in (RESULTS_JSONL_FILE, CHECKPOINT_FILE):
+        path = os.path.join(run_dir, name)
+        try:
+            return path, os.stat(path).st_mtime
+        except FileNotFoundError:
+            continue
+    return None
+
+
+class ResultsStore:
+    """
+    SQLite store with one row per (run, dilemma, persona) over all run
+    folders. Runs are re-ingested only when their source file changed.
+    """
+
+    def __init__(self, path=AGGREGATE_STORE_PATH):
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                model_key TEXT,
+                started_at TEXT,
+                rows INTEGER NOT NULL
+            )""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS rows (
+                run_id TEXT NOT NULL,
+                model_key TEXT,
+                dilemma_id INTEGER,
+                dilemma_title TEXT,
+                persona TEXT,
+                judge_rating REAL,
+                is_winner INTEGER,
+                winner_fallback INTEGER,
+                keyword_score REAL,
+                polarity REAL,
+                subjectivity REAL,
+                word_count INTEGER,
+                dilemma_elapsed_s REAL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_run ON rows (run_id)")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rows_model ON rows (model_key, persona)"
+        )
+        self.conn.commit()
+
+    def update(self, results_dir=RESULTS_DIR):
+        """
+        Ingests new or changed run folders and drops deleted ones.
+
+        Only the run folders are stat-ed, so a rescan with nothing new costs
+        one stat per run.
+        """
+        start_time = time.perf_counter()
+        known = dict(self.conn.execute("SELECT run_id, mtime FROM runs"))
+        seen = set()
+        ingested = 0
+
+        with os.scandir(results_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir() or not entry.name.startswith("run_"):
+                    continue
+
+                source = _run_source(entry.path)
+                if source is None:
+                    continue
+
+                seen.add(entry.name)
+                if known.get(entry.name) == source[1]:
+                    continue
+
+                self._ingest(entry.name, entry.path, *source)
+                ingested += 1
+
+        removed = [run_id for run_id in known if run_id not in seen]
+        for run_id in removed:
+            self._delete(run_id)
+
+        self.conn.commit()
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"Index: {len(seen)} runs, {ingested} ingested, {len(removed)} removed ({elapsed:.2f}s)"
+        )
+
+    def _delete(self, run_id):
+        self.conn.execute("DELETE FROM rows WHERE run_id = ?", (run_id,))
+        self.conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def _ingest(self, run_id, run_dir, source, mtime):
+        if os.path.basename(source) == RESULTS_JSONL_FILE:
+            rows = read_result_rows(source)
+        else:
+            # runs made with --no-report (or before results.jsonl existed)
+            _, results = load_run_results(run_dir)
+            rows = iter_result_rows(results, run_id=run_id)
+
+        # the folder name is the run id, even for copied/renamed folders
+        values = [[run_id] + [row.get(c) for c in ROW_COLUMNS[1:]] for row in rows]
+        model_key = values[0][1] if values else None
+
+        self._delete(run_id)
+        self.conn.executemany(
+            f"INSERT INTO rows ({', '.join(ROW_COLUMNS)}) VALUES ({', '.join('?' * len(ROW_COLUMNS))})",
+            values,
+        )
+
+        self.conn.execute(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+            (run_id, source, mtime, model_key, _run_started_at(run_id), len(values)),
+        )
+
+    def query(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def print_win_rates(store):
+    rows = store.query("""
+        SELECT model_key, persona, SUM(is_winner), COUNT(*)
+        FROM rows
+        GROUP BY model_key, persona
+        ORDER BY model_key, SUM(is_winner) DESC
+        """)
+
+    print("\nWIN RATES (share of dilemmas won):")
+    print("-" * 60)
+    current_model = None
+    for model_key, persona, wins, dilemmas in rows:
+        if model_key != current_model:
+            print(f"\n{model_key}:")
+            current_model = model_key
+        rate = wins / dilemmas if dilemmas else 0
+        bar = "#" * int(rate * 20) + " " * (20 - int(rate * 20))
+        print(f"  {persona:14} [{bar}] {rate:.1%} ({wins}/{dilemmas})")
+
+
+def _print_trend(store, column, title, value_format):
+    # one line per run in chronological order, one column per persona
+    rows = store.query(f"""
+        SELECT r.model_key, r.run_id, x.persona, AVG(x.{column})
+        FROM rows x JOIN runs r ON r.run_id = x.run_id
+        GROUP BY r.run_id, x.persona
+        ORDER BY r.model_key, r.started_at, r.run_id
+        """)
+
+    personas = list(dict.fromkeys(persona for _, _, persona, _ in rows))
+    table = {}
+    for model_key, run_id, persona, value in rows:
+        table.setdefault((model_key, run_id), {})[persona] = value
+
+    print(f"\n{title}:")
+    print("-" * 60)
+    print(f"{'run':34} " + " ".join(f"{p[:8]:>8}" for p in personas))
+    current_model = None
+    for (model_key, run_id), values in table.items():
+        if model_key != current_model:
+            print(f"{model_key}:")
+            current_model = model_key
+        cells = []
+        for persona in personas:
+            value = values.get(persona)
+            cells.append(
+                f"{'-':>8}" if value is None else f"{value_format.format(value):>8}"
+            )
+        print(f"  {run_id[:32]:32} " + " ".join(cells))
+
+
+def print_controllability_trend(store):
+    _print_trend(
+        store, "keyword_score", "CONTROLLABILITY TREND (keyword score)", "{:.0%}"
+    )
+
+
+def print_rating_drift(store):
+    _print_trend(store, "judge_rating", "JUDGE RATING DRIFT (avg /10)", "{:.1f}")
+
+
+QUERIES = {
+    "win-rates": print_win_rates,
+    "controllability": print_controllability_trend,
+    "ratings": print_rating_drift,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Aggregate results across all run folders"
+    )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="index",
+        choices=["index", *QUERIES],
+        help="index only updates the store, the others update it and print a table",
+    )
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--store", default=AGGREGATE_STORE_PATH)
+    parser.add_argument(
+        "--no-update", action="store_true", help="query the store as it is"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    store = ResultsStore(args.store)
+    if not args.no_update:
+        store.update(args.results_dir)
+
+    if args.command in QUERIES:
+        start_time = time.perf_counter()
+        QUERIES[args.command](store)
+        print(f"\n({(time.perf_counter() - start_time) * 1000:.1f} ms)")
+
+    store.close()
@@ -1,4 +1,13 @@
-from textblob import TextBlob
+import hashlib
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from config import (
+    SENTIMENT_BACKEND,
+    SENTIMENT_PARALLEL_THRESHOLD,
+    SENTIMENT_WORKERS,
+)
 
 # keywords each persona should use
 # helps measure "controllability" - did the model actually act like the persona?
@@ -232,53 +241,365 @@ PERSONA_FORBIDDEN = {
 }
 
 
+# saturation scoring: 5+ keywords = 100%
+TARGET_KEYWORDS = 5
+
+
+class PersonaMatcher:
+    """
+    Keyword / forbidden-word tables of one persona, lowercased once.
+
+    Matching is a plain substring test (same as "keyword in response"), which
+    on short responses beats a compiled regex alternation in CPython.
+    """
+
+    def __init__(self, keywords, forbidden):
+        self.keywords = [(keyword, keyword.lower()) for keyword in keywords]
+        self.forbidden = [(word, word.lower()) for word in forbidden]
+
+    def analyze(self, response):
+        if not self.keywords:
+            return {"score": 0.0, "keywords_found": [], "total_keywords": 0}
+
+        # convert response to lowercase for matching
+        response_lower = response.lower()
+
+        # find which keywords appear in the response
+        keywords_found = [
+            kw for kw, kw_lower in self.keywords if kw_lower in response_lower
+        ]
+        keywords_used_count = len(keywords_found)
+
+        # checking for forbidden words (penalty)
+        forbidden_found = [
+            w for w, w_lower in self.forbidden if w_lower in response_lower
+        ]
+
+        # penalty: each forbidden word cancels out 1 valid keyword equivalent
+        adjusted_count = keywords_used_count - (len(forbidden_found) * 1.5)
+
+        score = min(max(adjusted_count / TARGET_KEYWORDS, 0.0), 1.0)
+
+        return {
+            "score": score,
+            "keywords_found": keywords_found,
+            "forbidden_found": forbidden_found,
+            "raw_count": keywords_used_count,
+            "target_keywords": TARGET_KEYWORDS,
+        }
+
+
+_matchers = {}
+
+
+def get_persona_matcher(persona_name):
+    # built on first use and reused for every later response
+    matcher = _matchers.get(persona_name)
+    if matcher is None:
+        matcher = PersonaMatcher(
+            PERSONA_KEYWORDS.get(persona_name, []),
+            PERSONA_FORBIDDEN.get(persona_name, []),
+        )
+        _matchers[persona_name] = matcher
+    return matcher
+
+
 def analyze_persona_response(persona_name, response):
     """
     Analyzes how well a response matches its intended persona.
     """
-    # get keywords for this persona
-    keywords = PERSONA_KEYWORDS.get(persona_name, [])
+    return get_persona_matcher(persona_name).analyze(response)
+
+
+def analyze_responses(pairs):
+    """
+    Batch version of analyze_persona_response for (persona_name, response)
+    pairs. Identical pairs are only scored once.
+
+    Returns:
+        list: analysis dicts in the same order as pairs
+    """
+    scored = {}
+    analyses = []
+    for persona_name, response in pairs:
+        key = (persona_name, response)
+        analysis = scored.get(key)
+        if analysis is None:
+            analysis = get_persona_matcher(persona_name).analyze(response)
+            scored[key] = analysis
+        analyses.append(analysis)
+    return analyses
+
+
+def analyze_results(all_results):
+    """
+    Scores every opinion of every result in one call.
+
+    Returns:
+        list: one {persona_name: analysis} dict per result
+    """
+    pairs = [
+        (persona_name, opinion)
+        for result in all_results
+        for persona_name, opinion in result["opinions"].items()
+    ]
+    analyses = iter(analyze_responses(pairs))
+
+    return [
+        {persona_name: next(analyses) for persona_name in result["opinions"]}
+        for result in all_results
+    ]
+
+
+# =============================================================================
+# SENTIMENT
+# =============================================================================
+
 
-    if not keywords:
-        return {"score": 0.0, "keywords_found": [], "total_keywords": 0}
+class TextBlobBackend:
+    """Reference backend: a full TextBlob per text."""
 
-    # convert response to lowercase for matching
-    response_lower = response.lower()
+    name = "textblob"
 
-    # find which keywords appear in the response
-    keywords_found = []
-    for keyword in keywords:
-        if keyword.lower() in response_lower:
-            keywords_found.append(keyword)
+    def __init__(self):
+        # textblob (and nltk behind it) only loads once sentiment is needed
+        from textblob import TextBlob
 
-    # saturation scoring: 5+ keywords = 100%
-    TARGET_KEYWORDS = 5
-    keywords_used_count = len(keywords_found)
+        self.blob = TextBlob
 
-    # checking for forbidden words (penalty)
-    forbidden = PERSONA_FORBIDDEN.get(persona_name, [])
-    forbidden_found = [w for w in forbidden if w.lower() in response_lower]
+    def score(self, text):
+        sentiment = self.blob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+
+
+class PatternLexiconBackend:
+    """
+    Calls the pattern lexicon scorer behind TextBlob directly, skipping the
+    blob construction. Same lexicon, same rules, roughly half the time.
+    """
 
-    # penalty: each forbidden word cancels out 1 valid keyword equivalent
-    adjusted_count = keywords_used_count - (len(forbidden_found) * 1.5)
+    name = "pattern"
 
-    score = min(max(adjusted_count / TARGET_KEYWORDS, 0.0), 1.0)
+    def __init__(self):
+        from textblob.en.sentiments import pattern_sentiment
 
-    return {
-        "score": score,
-        "keywords_found": keywords_found,
-        "forbidden_found": forbidden_found,
-        "raw_count": keywords_used_count,
-        "target_keywords": TARGET_KEYWORDS,
-    }
+        self.pattern_sentiment = pattern_sentiment
+
+    def __reduce__(self):
+        # pattern_sentiment is a lambda and can't be pickled, pool workers
+        # look it up again
+        return (PatternLexiconBackend, ())
+
+    def score(self, text):
+        polarity, subjectivity = self.pattern_sentiment(text)
+        return polarity, subjectivity
+
+
+SENTIMENT_BACKENDS = {
+    TextBlobBackend.name: TextBlobBackend,
+    PatternLexiconBackend.name: PatternLexiconBackend,
+}
+
+# (backend name, text hash) -> {"polarity": ..., "subjectivity": ...}
+_sentiment_memo = {}
+
+
+def get_sentiment_backend(name=None):
+    return SENTIMENT_BACKENDS[name or SENTIMENT_BACKEND]()
+
+
+def analyze_sentiments(texts, backend=None, workers=SENTIMENT_WORKERS):
+    """
+    Batch sentiment for a list of texts.
+
+    Results are memoized by text hash, so the same opinion is never scored
+    twice. When more than SENTIMENT_PARALLEL_THRESHOLD texts are new they are
+    scored in a process pool (workers=1 forces the serial path).
+
+    Returns:
+        list: {"polarity", "subjectivity"} dicts in the same order as texts
+    """
+    if backend is None:
+        backend = get_sentiment_backend()
+
+    keys = [
+        (backend.name, hashlib.sha1(text.encode("utf-8")).hexdigest()) for text in texts
+    ]
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in _sentiment_memo:
+            missing[key] = text
+
+    if missing:
+        if len(missing) >= SENTIMENT_PARALLEL_THRESHOLD and workers != 1:
+            # not forked: the pipeline process may have torch/CUDA state
+            # and live threads, same as the chart pool
+            method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(method)
+            ) as pool:
+                scores = list(pool.map(backend.score, missing.values(), chunksize=256))
+        else:
+            scores = [backend.score(text) for text in missing.values()]
+
+        for key, (polarity, subjectivity) in zip(missing, scores):
+            _sentiment_memo[key] = {
+                "polarity": polarity,
+                "subjectivity": subjectivity,
+            }
+
+    return [dict(_sentiment_memo[key]) for key in keys]
 
 
 def analyze_sentiment(response):
-    blob = TextBlob(response)
-    return {
-        "polarity": blob.sentiment.polarity,
-        "subjectivity": blob.sentiment.subjectivity,
-    }
+    return analyze_sentiments([response])[0]
+
+
+def compare_sentiment_backends(reference, candidate, texts):
+    """
+    Largest absolute polarity/subjectivity difference between two backends,
+    used to check that a faster backend is a drop-in replacement.
+    """
+    max_diff = 0.0
+    for text in texts:
+        for ref_value, value in zip(reference.score(text), candidate.score(text)):
+            max_diff = max(max_diff, abs(ref_value - value))
+    return max_diff
+
+
+# name normalization
+CANONICAL_NAMES = {
+    "utilitarian": "Utilitarian",
+    "empath": "Empath",
+    "egoist": "Egoist",
+    "futurist": "Futurist",
+    "hero": "Hero",
+    "devilsadvocate": "DevilsAdvocate",
+    "devils": "DevilsAdvocate",
+    "devil": "DevilsAdvocate",
+    "advocate": "DevilsAdvocate",
+}
+
+EXCLUDED_WINNERS = {"synthesizer", "adviser", "advisor", "judge"}
+
+
+def normalize_winner_name(raw_name):
+    if not raw_name:
+        return "Unknown"
+
+    # cleanup: no apostrophes, spaces, convert to lowercase
+    cleaned = raw_name.lower().replace("'", "").replace(" ", "").replace("-", "")
+
+    for excluded in EXCLUDED_WINNERS:
+        if excluded in cleaned:
+            return "Unknown"
+    if cleaned in CANONICAL_NAMES:
+        return CANONICAL_NAMES[cleaned]
+
+    # partial matching for multi-word names ("Devil's Advocate")
+    for key, canonical in CANONICAL_NAMES.items():
+        if key in cleaned or cleaned in key:
+            return canonical
+
+    # fallback to title case of the raw name
+    return raw_name.title()
+
+
+def extract_winner(verdict_text, llm_ratings=None):
+    # WINNER: XXXXXX (capturing everything until newline or REASON)
+    match = re.search(
+        r"WINNER:\s*([A-Za-z'\s]+?)(?:\n|REASON|$)", verdict_text, re.IGNORECASE
+    )
+    if match:
+        winner = normalize_winner_name(match.group(1).strip())
+        if winner != "Unknown":
+            return (winner, False)
+
+    # **Winner: XXXXXX**
+    match = re.search(r"\*\*Winner:\s*([A-Za-z'\s]+?)\*\*", verdict_text, re.IGNORECASE)
+    if match:
+        winner = normalize_winner_name(match.group(1).strip())
+        if winner != "Unknown":
+            return (winner, False)
+
+    # The XXXXXX wins
+    match = re.search(r"The\s+([A-Za-z'\s]+?)\s+wins", verdict_text, re.IGNORECASE)
+    if match:
+        winner = normalize_winner_name(match.group(1).strip())
+        if winner != "Unknown":
+            return (winner, False)
+
+    # XXXXXX argument is strongest
+    match = re.search(
+        r"([A-Za-z'\s]+?)\s+argument\s+is\s+strongest", verdict_text, re.IGNORECASE
+    )
+    if match:
+        winner = normalize_winner_name(match.group(1).strip())
+        if winner != "Unknown":
+            return (winner, False)
+
+    # FALLBACK: extract winner from highest rating if jusge didn't state it individualtly
+    if llm_ratings and isinstance(llm_ratings, dict) and len(llm_ratings) > 0:
+        # Synthesizer is not comptetitor
+        filtered_ratings = {
+            k: v for k, v in llm_ratings.items() if k.lower() not in EXCLUDED_WINNERS
+        }
+        if filtered_ratings:
+            best_persona = max(filtered_ratings, key=filtered_ratings.get)
+            best_score = filtered_ratings[best_persona]
+            # only use fallback if score is > 0
+            if best_score > 0:
+                return (normalize_winner_name(best_persona), True)
+
+    return ("Unknown", False)
+
+
+def annotate_result(result):
+    """
+    Runs every per-opinion analysis once and stores it on the result, so
+    summaries, reports and plots don't have to recompute anything.
+
+    Adds:
+        result["analysis"]: {persona: {score, keywords_found, forbidden_found,
+                             raw_count, target_keywords, sentiment, word_count}}
+        result["winner"], result["winner_fallback"]
+    """
+    return annotate_results([result])[0]
+
+
+def annotate_results(all_results):
+    # results loaded from older checkpoints may not be annotated yet
+    pending = [result for result in all_results if "analysis" not in result]
+
+    pairs = [
+        (persona_name, opinion)
+        for result in pending
+        for persona_name, opinion in result["opinions"].items()
+    ]
+    analyses = iter(analyze_responses(pairs))
+    sentiments = iter(analyze_sentiments([opinion for _, opinion in pairs]))
+
+    for result in pending:
+        records = {}
+        for persona_name, opinion in result["opinions"].items():
+            record = dict(next(analyses))
+            record["sentiment"] = next(sentiments)
+            record["word_count"] = len(opinion.split())
+            records[persona_name] = record
+
+        winner, was_fallback = extract_winner(
+            result.get("judge_verdict", ""), result.get("llm_ratings", {})
+        )
+
+        result["analysis"] = records
+        result["winner"] = winner
+        result["winner_fallback"] = was_fallback
+
+    return all_results
 
 
 def print_analysis_summary(all_results):
@@ -286,13 +607,14 @@ def print_analysis_summary(all_results):
     print("  CONTROLLABILITY ANALYSIS")
     print("=" * 60)
 
+    annotate_results(all_results)
+
     # collect scores for each persona
     persona_scores = {name: [] for name in PERSONA_KEYWORDS.keys()}
 
     for result in all_results:
-        for persona_name, opinion in result["opinions"].items():
-            analysis = analyze_persona_response(persona_name, opinion)
-            persona_scores[persona_name].append(analysis["score"])
+        for persona_name, record in result["analysis"].items():
+            persona_scores[persona_name].append(record["score"])
 
     # print average scores
     print("\nAverage Controllability Scores:")
@@ -338,12 +660,14 @@ def print_sentiment_summary(all_results):
     print("  SENTIMENT ANALYSIS (TextBlob)")
     print("=" * 60)
 
+    annotate_results(all_results)
+
     persona_polarity = {}
     persona_subjectivity = {}
 
     for result in all_results:
-        for persona_name, opinion in result["opinions"].items():
-            sentiment = analyze_sentiment(opinion)
+        for persona_name, record in result["analysis"].items():
+            sentiment = record["sentiment"]
             if persona_name not in persona_polarity:
                 persona_polarity[persona_name] = []
                 persona_subjectivity[persona_name] = []
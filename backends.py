@@ -0,0 +1,378 @@
+import asyncio
+import http.client
+import json
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import instrumentation
+from config import (
+    INFERENCE_BACKEND,
+    OPENAI_BASE_URL,
+    OPENAI_API_KEY,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_TIMEOUT,
+    GENERATION_BATCH_SIZE,
+    GENERATION_SEED,
+)
+from generation_cache import get_generation_cache, make_cache_key
+from profiles import (
+    get_generation_profile,
+    is_cacheable,
+    print_role_stats,
+    record_role_cost,
+    role_stats,
+    trim_response,
+)
+
+
+class InferenceBackend:
+    """
+    Everything the pipeline needs from a model: load it, answer
+    (system_prompt, user_message) pairs for a generation role, free it.
+    """
+
+    # calls waiting for the next batch of agenerate(), see _run_pending
+    _pending = None
+    _batch_task = None
+    _batch_executor = None
+
+    def load(self):
+        pass
+
+    def generate(self, system_prompt, user_message, role=None):
+        return self.generate_batch([(system_prompt, user_message)], roles=role)[0]
+
+    async def agenerate(self, system_prompt, user_message, role=None):
+        """
+        generate() for the asyncio driver. Calls that come in while a batch
+        is running are collected and answered by the next generate_batch,
+        which runs in one worker thread, so dilemmas in flight still share
+        batches on an in-process model.
+        """
+        if self._pending is None:
+            self._pending = []
+            self._batch_executor = ThreadPoolExecutor(max_workers=1)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((system_prompt, user_message), role, future))
+        if self._batch_task is None:
+            self._batch_task = asyncio.ensure_future(self._run_pending())
+        return await future
+
+    async def _run_pending(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending:
+                batch = self._pending[:GENERATION_BATCH_SIZE]
+                del self._pending[:GENERATION_BATCH_SIZE]
+                try:
+                    responses = await loop.run_in_executor(
+                        self._batch_executor,
+                        self.generate_batch,
+                        [prompt for prompt, _, _ in batch],
+                        GENERATION_BATCH_SIZE,
+                        [role for _, role, _ in batch],
+                    )
+                except Exception as e:
+                    for _, _, future in batch:
+                        # the caller may have been cancelled in the meantime
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for (_, _, future), response in zip(batch, responses):
+                    if not future.done():
+                        future.set_result(response)
+        finally:
+            self._batch_task = None
+
+    def generate_batch(self, prompts, batch_size=GENERATION_BATCH_SIZE, roles=None):
+        """
+        roles can be one role for the whole batch or one per prompt.
+
+        Returns:
+            list: responses in the same order as prompts
+        """
+        raise NotImplementedError
+
+    def unload(self):
+        pass
+
+    def print_stats(self):
+        pass
+
+
+class HFBackend(InferenceBackend):
+    """Weights loaded in this process, generation through model_engine."""
+
+    def __init__(self, model_id, device):
+        self.model_id = model_id
+        self.device = device
+        self.model = None
+        self.tokenizer = None
+
+    def load(self):
+        # torch/transformers are only imported once a model is really loaded
+        from model_engine import load_model
+
+        self.model, self.tokenizer = load_model(self.model_id, self.device)
+
+    def generate(self, system_prompt, user_message, role=None):
+        from model_engine import generate_response
+
+        return generate_response(
+            self.model, self.tokenizer, system_prompt, user_message, role=role
+        )
+
+    def generate_batch(self, prompts, batch_size=GENERATION_BATCH_SIZE, roles=None):
+        from model_engine import generate_batch
+
+        return generate_batch(
+            self.model, self.tokenizer, prompts, batch_size=batch_size, roles=roles
+        )
+
+    def unload(self):
+        from model_engine import unload_model
+
+        if self._batch_executor is not None:
+            self._batch_executor.shutdown()
+            self._pending = self._batch_executor = None
+        unload_model(self.model, self.tokenizer)
+        self.model = self.tokenizer = None
+
+    def print_stats(self):
+        from model_engine import print_prefix_cache_stats
+
+        print_role_stats()
+        print_prefix_cache_stats()
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one server, each used by one request
+    at a time. Connections are opened lazily, up to size.
+    """
+
+    def __init__(self, base_url, size, timeout):
+        parts = urlsplit(base_url)
+        self.connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.host = parts.netloc
+        self.path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(None)
+
+    def request(self, method, path, body, headers):
+        connection = self.idle.get()
+        try:
+            # an idle keep-alive connection may have been closed by the
+            # server in the meantime, the request is retried once on a new one
+            for attempt in range(2):
+                if connection is None:
+                    connection = self.connection_class(self.host, timeout=self.timeout)
+                try:
+                    connection.request(method, self.path + path, body, headers)
+                    response = connection.getresponse()
+                    return response.status, response.read()
+                except (http.client.RemoteDisconnected, ConnectionError):
+                    connection.close()
+                    connection = None
+                    if attempt:
+                        raise
+        except Exception:
+            if connection is not None:
+                connection.close()
+            connection = None
+            raise
+        finally:
+            self.idle.put(connection)
+
+    def close(self):
+        while not self.idle.empty():
+            connection = self.idle.get_nowait()
+            if connection is not None:
+                connection.close()
+
+
+class OpenAIBackend(InferenceBackend):
+    """
+    Client for an OpenAI-compatible /chat/completions server, no weights
+    are loaded here.
+
+    A batch is sent as concurrent requests (at most max_connections in
+    flight) over pooled keep-alive connections, so the server can batch them
+    on its side. Role budgets map to max_tokens / stop; sentence limits are
+    applied to the returned text.
+    """
+
+    def __init__(
+        self,
+        model_name,
+        base_url=OPENAI_BASE_URL,
+        api_key=OPENAI_API_KEY,
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        timeout=OPENAI_TIMEOUT,
+    ):
+        self.model_name = model_name
+        self.base_url = base_url
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.pool = None
+        self.executor = None
+
+    def load(self):
+        print(f"Using server: {self.base_url} (model {self.model_name})")
+        self.pool = ConnectionPool(self.base_url, self.max_connections, self.timeout)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_connections)
+
+    def _headers(self):
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _payload(self, system_prompt, user_message, profile):
+        payload = {
+            "model": self.model_name,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            "max_tokens": profile["max_new_tokens"],
+            # greedy on the server when sampling is off
+            "temperature": profile["temperature"] if profile["do_sample"] else 0.0,
+        }
+        if profile.get("stop_strings"):
+            payload["stop"] = list(profile["stop_strings"])
+        if GENERATION_SEED is not None:
+            payload["seed"] = GENERATION_SEED
+        return payload
+
+    def _complete(self, system_prompt, user_message, profile, role):
+        body = json.dumps(self._payload(system_prompt, user_message, profile))
+
+        start = time.perf_counter()
+        status, data = self.pool.request(
+            "POST", "/chat/completions", body.encode("utf-8"), self._headers()
+        )
+        seconds = time.perf_counter() - start
+
+        if status != 200:
+            raise RuntimeError(
+                f"{self.base_url} returned {status}: {data[:200].decode(errors='replace')}"
+            )
+
+        completion = json.loads(data)
+        usage = completion.get("usage") or {}
+        labels = {"model": self.model_name, "role": role or "default"}
+        instrumentation.observe("request_s", seconds, **labels)
+        instrumentation.count("prompt_tokens", usage.get("prompt_tokens", 0), **labels)
+        instrumentation.count(
+            "generated_tokens", usage.get("completion_tokens", 0), **labels
+        )
+
+        text = completion["choices"][0]["message"]["content"] or ""
+        return text, usage.get("completion_tokens", 0), seconds
+
+    def _cache_key(self, system_prompt, user_message, profile):
+        return make_cache_key(
+            f"{self.base_url}#{self.model_name}",
+            system_prompt,
+            user_message,
+            profile,
+            GENERATION_SEED,
+        )
+
+    def generate_batch(self, prompts, batch_size=GENERATION_BATCH_SIZE, roles=None):
+        if not prompts:
+            return []
+
+        if roles is None or isinstance(roles, str):
+            roles = [roles] * len(prompts)
+        profiles = [get_generation_profile(role) for role in roles]
+
+        # only greedy or seeded prompts are looked up, see is_cacheable
+        keys = {
+            i: self._cache_key(*prompts[i], profile)
+            for i, profile in enumerate(profiles)
+            if is_cacheable(profile)
+        }
+        cached = get_generation_cache().get_many(list(keys.values())) if keys else {}
+
+        responses = [None] * len(prompts)
+        for i, key in keys.items():
+            if key in cached:
+                responses[i] = cached[key]
+                record_role_cost(roles[i], cached=True)
+
+        missing = [
+            i for i in range(len(prompts)) if i not in keys or keys[i] not in cached
+        ]
+
+        futures = [
+            self.executor.submit(self._complete, *prompts[i], profiles[i], roles[i])
+            for i in missing
+        ]
+        for i, future in zip(missing, futures):
+            text, new_tokens, seconds = future.result()
+            responses[i] = trim_response(text, profiles[i])
+            record_role_cost(roles[i], new_tokens=new_tokens, seconds=seconds)
+
+        if keys and missing:
+            get_generation_cache().put_many(
+                [(keys[i], responses[i]) for i in missing if i in keys]
+            )
+
+        return responses
+
+    async def agenerate(self, system_prompt, user_message, role=None):
+        # one request per call, batching is up to the server
+        profile = get_generation_profile(role)
+        key = None
+        if is_cacheable(profile):
+            key = self._cache_key(system_prompt, user_message, profile)
+            cached = get_generation_cache().get(key)
+            if cached is not None:
+                record_role_cost(role, cached=True)
+                return cached
+
+        text, new_tokens, seconds = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._complete, system_prompt, user_message, profile, role
+        )
+        response = trim_response(text, profile)
+        record_role_cost(role, new_tokens=new_tokens, seconds=seconds)
+
+        if key is not None:
+            get_generation_cache().put(key, response)
+        return response
+
+    def unload(self):
+        self.executor.shutdown()
+        self.pool.close()
+        role_stats.clear()
+
+    def print_stats(self):
+        print_role_stats()
+
+
+def get_backend(model_config, device):
+    """The backend a model in AVAILABLE_MODELS runs on."""
+    backend = model_config.get("backend", INFERENCE_BACKEND)
+
+    if backend == "hf":
+        return HFBackend(model_config["id"], device)
+    if backend == "openai":
+        return OpenAIBackend(
+            model_config.get("served_name", model_config["id"]),
+            base_url=model_config.get("base_url", OPENAI_BASE_URL),
+        )
+    raise ValueError(f"Unknown inference backend: {backend!r}")
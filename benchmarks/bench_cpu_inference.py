@@ -0,0 +1,147 @@
+"""
+CPU generation speed of model_engine.load_model: float32 vs bfloat16 vs
+dynamic int8, on a small local Llama (random weights and a BPE tokenizer
+built on the fly, nothing is downloaded)
+or any model id / path given with --model.
+
+    python benchmarks/bench_cpu_inference.py --hidden-size 512 --layers 8
+    python benchmarks/bench_cpu_inference.py --model huihui-ai/Qwen2.5-0.5B-Instruct-abliterated-v3
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch  # noqa: E402
+from tokenizers import (
+    Tokenizer,
+    decoders,
+    models,
+    pre_tokenizers,
+    trainers,
+)  # noqa: E402
+from transformers import (  # noqa: E402
+    LlamaConfig,
+    LlamaForCausalLM,
+    PreTrainedTokenizerFast,
+)
+
+import model_engine  # noqa: E402
+import profiles  # noqa: E402
+from config import PERSONAS, TEST_DILEMMAS  # noqa: E402
+from prompts import build_persona_prompt  # noqa: E402
+
+CHAT_TEMPLATE = (
+    "{{ bos_token }}{% for m in messages %}<|start|>{{ m['role'] }}\n"
+    "{{ m['content'] }}<|end|>{% endfor %}"
+    "{% if add_generation_prompt %}<|start|>assistant\n{% endif %}"
+)
+
+
+def build_tokenizer():
+    # small byte-level BPE trained on the project's own prompts, no download
+    corpus = [persona["system_prompt"] for persona in PERSONAS.values()]
+    corpus += [dilemma["description"] for dilemma in TEST_DILEMMAS]
+
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=2000,
+        special_tokens=["<unk>", "<s>", "</s>", "<|start|>", "<|end|>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+    )
+    tokenizer.train_from_iterator(corpus, trainer)
+
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, bos_token="<s>", eos_token="</s>", unk_token="<unk>"
+    )
+    tokenizer.chat_template = CHAT_TEMPLATE
+    return tokenizer
+
+
+def build_tiny_model(path, hidden_size, layers):
+    tokenizer = build_tokenizer()
+
+    torch.manual_seed(0)
+    model = LlamaForCausalLM(
+        LlamaConfig(
+            vocab_size=len(tokenizer),
+            hidden_size=hidden_size,
+            intermediate_size=hidden_size * 4,
+            num_hidden_layers=layers,
+            num_attention_heads=8,
+            num_key_value_heads=4,
+            bos_token_id=tokenizer.bos_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+        )
+    )
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+
+def bench(model_id, label, prompts, new_tokens, **load_kwargs):
+    model, tokenizer = model_engine.load_model(model_id, device="cpu", **load_kwargs)
+    # every prompt has to reach the model
+    profiles.USE_GENERATION_CACHE = False
+    profiles.DO_SAMPLE = False
+    profiles.MAX_NEW_TOKENS = new_tokens
+
+    # warm-up (kernel selection, allocator)
+    model_engine.generate_batch(model, tokenizer, prompts[:1])
+
+    start = time.perf_counter()
+    responses = model_engine.generate_batch(model, tokenizer, prompts)
+    elapsed = time.perf_counter() - start
+
+    generated = sum(
+        len(tokenizer(response, add_special_tokens=False).input_ids)
+        for response in responses
+    )
+    model_engine.unload_model(model, tokenizer)
+
+    print(f"  {label:10} {elapsed:7.2f}s  {generated / elapsed:8.1f} tokens/s")
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", help="model id or path (default: tiny random Llama)")
+    parser.add_argument("--hidden-size", type=int, default=512)
+    parser.add_argument("--layers", type=int, default=8)
+    parser.add_argument("--new-tokens", type=int, default=32)
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        model_engine.configure_cpu_threads(args.threads)
+
+    # one persona batch per test dilemma
+    prompts = [
+        (persona["system_prompt"], build_persona_prompt(dilemma))
+        for dilemma in TEST_DILEMMAS
+        for persona in PERSONAS.values()
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_id = args.model
+        if model_id is None:
+            build_tiny_model(tmp, args.hidden_size, args.layers)
+            model_id = tmp
+
+        print(
+            f"{len(prompts)} prompts, {args.new_tokens} new tokens each, "
+            f"{torch.get_num_threads()} threads\n"
+        )
+
+        bench(model_id, "float32", prompts, args.new_tokens, cpu_dtype="float32")
+        bench(model_id, "bfloat16", prompts, args.new_tokens, cpu_dtype="bfloat16")
+        bench(model_id, "int8", prompts, args.new_tokens, quantize=True)
+
+
+if __name__ == "__main__":
+    main()
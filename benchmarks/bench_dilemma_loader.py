@@ -0,0 +1,140 @@
+"""
+Load time and peak memory of the Social Chemistry 101 loaders on a
+synthetic TSV with the same columns as the real dataset.
+
+    python benchmarks/bench_dilemma_loader.py --rows 356000
+"""
+
+import argparse
+import csv
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+COLUMNS = [
+    "area",
+    "m",
+    "split",
+    "rot-agree",
+    "rot-categorization",
+    "rot-moral-foundations",
+    "rot-char-targeting",
+    "rot-bad",
+    "rot-judgment",
+    "action",
+    "action-agency",
+    "action-moral-judgment",
+    "action-agree",
+    "action-legal",
+    "action-pressure",
+    "action-char-involved",
+    "action-hypothetical",
+    "situation",
+    "situation-short-id",
+    "rot",
+    "rot-id",
+    "rot-worker-id",
+    "breakdown-worker-id",
+    "n-characters",
+    "characters",
+]
+
+WORDS = (
+    "friend family money work party dog wedding brother sister boss car house "
+    "dinner gift lie secret help borrow pay roommate neighbour"
+).split()
+AREAS = ["amitheasshole", "confessions", "dearabby", "rocstories"]
+CATEGORIES = ["morality-ethics", "social-norms", "advice", "description", ""]
+
+# runs in a fresh interpreter so ru_maxrss only covers one loader
+MEASURE_SCRIPT = """
+import json, resource, sys, time
+from pathlib import Path
+sys.path.insert(0, {repo!r})
+import dilemma_loader as dl
+dl.SOCIAL_CHEM_PATH = Path({tsv!r})
+start = time.perf_counter()
+if {mode!r} == "full":
+    df = dl.load_social_chemistry_data()
+    df = dl.filter_candidates(df).drop_duplicates(subset=["situation-short-id"])
+else:
+    df = dl.load_filtered_social_chemistry_data()
+seconds = time.perf_counter() - start
+peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"rows": len(df), "seconds": seconds, "peak_rss_mb": peak_mb}}))
+"""
+
+
+def write_synthetic_tsv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        writer.writerow(COLUMNS)
+
+        written = 0
+        situation_id = 0
+        while written < rows:
+            situation = "I " + " ".join(rng.choices(WORDS, k=rng.randint(5, 90)))
+            area = rng.choice(AREAS)
+            # every situation gets a handful of rules of thumb, like the real data
+            for rot_index in range(rng.randint(1, 8)):
+                row = dict.fromkeys(COLUMNS, "")
+                row.update(
+                    {
+                        "area": area,
+                        "m": "1",
+                        "split": "train",
+                        "rot-categorization": rng.choice(CATEGORIES),
+                        "rot-bad": "1" if rng.random() < 0.1 else "0",
+                        "action-moral-judgment": rng.choice(
+                            ["-2", "-1", "0", "1", "2", ""]
+                        ),
+                        "situation": situation + ".",
+                        "situation-short-id": f"s{situation_id:07d}",
+                        "rot": "It's bad to " + " ".join(rng.choices(WORDS, k=6)),
+                        "rot-id": f"rot/{situation_id}/{rot_index}",
+                        "n-characters": "2",
+                        "characters": "narrator|a friend",
+                    }
+                )
+                writer.writerow(row.values())
+                written += 1
+            situation_id += 1
+
+
+def measure(mode, tsv_path):
+    script = MEASURE_SCRIPT.format(repo=str(REPO_ROOT), tsv=str(tsv_path), mode=mode)
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=356_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tsv_path = Path(tmp) / "social-chem-101.synthetic.tsv"
+        write_synthetic_tsv(tsv_path, args.rows)
+        size_mb = tsv_path.stat().st_size / (1024 * 1024)
+        print(f"Synthetic TSV: {args.rows} rows, {size_mb:.0f} MB\n")
+
+        results = {mode: measure(mode, tsv_path) for mode in ("full", "streaming")}
+
+    print(f"{'loader':10} {'candidates':>10} {'time':>8} {'peak RSS':>10}")
+    for mode, result in results.items():
+        print(
+            f"{mode:10} {result['rows']:>10} {result['seconds']:>7.2f}s "
+            f"{result['peak_rss_mb']:>7.0f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
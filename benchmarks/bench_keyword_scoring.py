@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of the keyword/forbidden-word scoring in analysis.py on
+synthetic persona responses.
+
+    python benchmarks/bench_keyword_scoring.py --responses 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analysis import (  # noqa: E402
+    PERSONA_KEYWORDS,
+    PERSONA_FORBIDDEN,
+    TARGET_KEYWORDS,
+    analyze_persona_response,
+    analyze_results,
+)
+
+FILLER = "the a to of and is it this that should would they people choice".split()
+
+
+def reference_analyze(persona_name, response):
+    # straightforward per-keyword loop, used to check the scores match
+    keywords = PERSONA_KEYWORDS.get(persona_name, [])
+    response_lower = response.lower()
+    found = [k for k in keywords if k.lower() in response_lower]
+    forbidden = [
+        w
+        for w in PERSONA_FORBIDDEN.get(persona_name, [])
+        if w.lower() in response_lower
+    ]
+    adjusted_count = len(found) - len(forbidden) * 1.5
+    return min(max(adjusted_count / TARGET_KEYWORDS, 0.0), 1.0), found, forbidden
+
+
+def make_results(num_responses, seed=0):
+    rng = random.Random(seed)
+    vocab = sorted(
+        {w for words in PERSONA_KEYWORDS.values() for w in words}
+        | {w for words in PERSONA_FORBIDDEN.values() for w in words}
+    )
+    vocab += FILLER * 4
+    personas = list(PERSONA_KEYWORDS)
+
+    def response():
+        words = rng.choices(vocab, k=rng.randint(10, 60))
+        return " ".join(w.capitalize() if rng.random() < 0.1 else w for w in words)
+
+    # one result per "dilemma", every persona answers once
+    return [
+        {"opinions": {persona: response() for persona in personas}}
+        for _ in range(num_responses // len(personas))
+    ]
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    value = fn()
+    print(f"  {label:38} {time.perf_counter() - start:7.3f}s")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--responses", type=int, default=100_000)
+    args = parser.parse_args()
+
+    results = make_results(args.responses)
+    pairs = [(p, o) for r in results for p, o in r["opinions"].items()]
+    print(f"{len(pairs)} synthetic responses\n")
+
+    reference = timed(
+        "reference loop (per call)",
+        lambda: [reference_analyze(p, o) for p, o in pairs],
+    )
+    per_call = timed(
+        "analyze_persona_response (per call)",
+        lambda: [analyze_persona_response(p, o) for p, o in pairs],
+    )
+    batch = timed("analyze_results (batch)", lambda: analyze_results(results))
+
+    batch_flat = [a for analyses in batch for a in analyses.values()]
+    for (score, found, forbidden), a, b in zip(reference, per_call, batch_flat):
+        assert a == b
+        assert (score, found, forbidden) == (
+            a["score"],
+            a["keywords_found"],
+            a["forbidden_found"],
+        )
+    print("\nScores identical across all three paths.")
+
+
+if __name__ == "__main__":
+    main()
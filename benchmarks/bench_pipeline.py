@@ -0,0 +1,268 @@
+"""
+End-to-end timings of run_pipeline_for_model and its hot stages on a tiny
+random Llama (built locally, nothing is downloaded), for growing numbers of
+dilemmas:
+
+    load_dilemmas   get_random_dilemmas on a synthetic Social Chemistry TSV
+    pipeline        run_pipeline_for_model: generation, analysis, report, charts
+    generation      generate() time inside the pipeline (tokenize/detokenize
+                    and chat template included), from the instrumentation
+    scoring         persona keyword scoring of every opinion
+    sentiment       sentiment of every opinion
+    plotting        every chart, rendered in-process
+    report          summaries, results .txt/.jsonl/.parquet
+
+Results are written as JSON with --output. With --baseline, any stage that
+got slower than the baseline by more than --tolerance fails the run (exit
+code 1), so it can guard a branch against perf regressions.
+
+    python benchmarks/bench_pipeline.py --counts 3 30 100 1000 --output bench.json
+    python benchmarks/bench_pipeline.py --counts 3 30 --baseline bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch  # noqa: E402
+import transformers  # noqa: E402
+
+import analysis  # noqa: E402
+import dilemma_loader  # noqa: E402
+import instrumentation  # noqa: E402
+import main as pipeline  # noqa: E402
+import profiles  # noqa: E402
+from bench_cpu_inference import build_tiny_model  # noqa: E402
+from bench_dilemma_loader import write_synthetic_tsv  # noqa: E402
+from config import PERSONAS  # noqa: E402
+from report import write_report  # noqa: E402
+from visualization import generate_visual_report  # noqa: E402
+
+# generate() related histograms that make up the "generation" stage
+GENERATION_SPANS = ("generate_s", "tokenize_s", "detokenize_s", "chat_template_s")
+
+# stages shorter than this are never reported as regressions, the noise
+# of a single run is larger than the difference
+MIN_REGRESSION_S = 0.05
+
+
+def use_tiny_generation_settings(new_tokens):
+    # greedy and a fixed budget per role, so every run generates the same
+    # text; the generation cache would turn later runs into lookups
+    profiles.USE_GENERATION_CACHE = False
+    profiles.DO_SAMPLE = False
+    profiles.MAX_NEW_TOKENS = new_tokens
+    profiles.GENERATION_PROFILES = {
+        role: {**profile, "max_new_tokens": new_tokens, "do_sample": False}
+        for role, profile in profiles.GENERATION_PROFILES.items()
+    }
+
+
+def use_synthetic_dataset(directory, num_dilemmas):
+    # a few candidates per requested dilemma, the loader's filters drop some
+    tsv_path = Path(directory) / "social-chem-101.v1.0.tsv"
+    write_synthetic_tsv(tsv_path, max(2000, num_dilemmas * 40))
+
+    dilemma_loader.SOCIAL_CHEM_PATH = tsv_path
+    dilemma_loader.CANDIDATE_POOL_PATH = tsv_path.with_name("candidate_pool.parquet")
+    dilemma_loader.CANDIDATE_POOL_META_PATH = tsv_path.with_name(
+        "candidate_pool.meta.json"
+    )
+    dilemma_loader._cached_df = None
+    dilemma_loader._cached_pool = None
+
+
+def timed(fn):
+    # the pipeline prints a lot per dilemma, only the timings matter here
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = fn()
+    return value, time.perf_counter() - start
+
+
+def strip_analysis(results):
+    # fresh copies without the annotations, so scoring starts from scratch
+    return [
+        {
+            key: value
+            for key, value in result.items()
+            if key not in ("analysis", "winner", "winner_fallback")
+        }
+        for result in results
+    ]
+
+
+def bench_count(num_dilemmas, model_path, work_dir):
+    """Returns {stage: seconds} for one dilemma count."""
+    stages = {}
+    use_synthetic_dataset(work_dir, num_dilemmas)
+
+    # cold: builds the candidate pool from the TSV, then samples
+    dilemmas, stages["load_dilemmas"] = timed(
+        lambda: dilemma_loader.get_random_dilemmas(num_dilemmas, seed=0)
+    )
+    if len(dilemmas) < num_dilemmas:
+        raise RuntimeError(f"only {len(dilemmas)} synthetic dilemmas available")
+
+    run_dir = Path(work_dir) / f"run_{num_dilemmas}"
+    run_dir.mkdir()
+    model_config = {"name": "Tiny", "id": model_path, "description": "benchmark"}
+
+    instrumentation.enable()
+    (results, _), stages["pipeline"] = timed(
+        lambda: pipeline.run_pipeline_for_model(
+            "tiny",
+            model_config,
+            dilemmas,
+            output_dir=str(run_dir),
+            plot_mode="serial",
+            device="cpu",
+        )
+    )
+    stages["generation"] = sum(
+        histogram["sum"]
+        for histogram in instrumentation.snapshot()["histograms"]
+        if histogram["name"] in GENERATION_SPANS
+    )
+    instrumentation.enable(False)
+
+    opinions = [
+        opinion for result in results for opinion in result["opinions"].values()
+    ]
+
+    _, stages["scoring"] = timed(
+        lambda: analysis.analyze_results(strip_analysis(results))
+    )
+
+    analysis._sentiment_memo.clear()
+    _, stages["sentiment"] = timed(lambda: analysis.analyze_sentiments(opinions))
+
+    _, stages["plotting"] = timed(
+        lambda: generate_visual_report(
+            results, None, output_dir=str(run_dir), plot_mode="serial"
+        )
+    )
+
+    _, stages["report"] = timed(
+        lambda: write_report(
+            results,
+            str(run_dir),
+            model_key="tiny",
+            model_name="Tiny",
+            plot_mode="off",
+        )
+    )
+
+    return stages
+
+
+def environment(args):
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "torch": torch.__version__,
+        "transformers": transformers.__version__,
+        "threads": torch.get_num_threads(),
+        "hidden_size": args.hidden_size,
+        "layers": args.layers,
+        "new_tokens": args.new_tokens,
+        "personas": len(PERSONAS),
+    }
+
+
+def find_regressions(rows, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (row["stage"], row["dilemmas"]): row["seconds"]
+            for row in json.load(f)["results"]
+        }
+
+    regressions = []
+    for row in rows:
+        before = baseline.get((row["stage"], row["dilemmas"]))
+        if before is None:
+            continue
+        if (
+            row["seconds"] > before * tolerance
+            and row["seconds"] - before > MIN_REGRESSION_S
+        ):
+            regressions.append(
+                f"{row['stage']} @ {row['dilemmas']} dilemmas: "
+                f"{before:.3f}s -> {row['seconds']:.3f}s"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--counts", type=int, nargs="+", default=[3, 30, 100, 1000])
+    parser.add_argument("--hidden-size", type=int, default=64)
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--new-tokens", type=int, default=8)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument(
+        "--baseline", help="JSON from an earlier --output to compare with"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="allowed slowdown vs --baseline (1.25 = 25%%)",
+    )
+    args = parser.parse_args()
+
+    use_tiny_generation_settings(args.new_tokens)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = str(Path(tmp) / "tiny-llama")
+        build_tiny_model(model_path, args.hidden_size, args.layers)
+
+        print(f"{'dilemmas':>8}  {'stage':14} {'seconds':>9} {'ms/dilemma':>11}")
+        for num_dilemmas in args.counts:
+            work_dir = Path(tmp) / f"dilemmas_{num_dilemmas}"
+            work_dir.mkdir()
+
+            for stage, seconds in bench_count(
+                num_dilemmas, model_path, work_dir
+            ).items():
+                rows.append(
+                    {
+                        "stage": stage,
+                        "dilemmas": num_dilemmas,
+                        "seconds": round(seconds, 4),
+                        "ms_per_dilemma": round(seconds * 1000 / num_dilemmas, 3),
+                    }
+                )
+                print(
+                    f"{num_dilemmas:>8}  {stage:14} {seconds:9.3f} "
+                    f"{seconds * 1000 / num_dilemmas:11.2f}"
+                )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(args), "results": rows}, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(rows, args.baseline, args.tolerance)
+        if regressions:
+            print(f"\nFAILED (slower than baseline x{args.tolerance}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo stage slower than the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Sentiment backends in analysis.py: speed of each backend, serial vs process
+pool, and a check that the faster backend matches TextBlob.
+
+    python benchmarks/bench_sentiment.py --texts 20000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analysis  # noqa: E402
+
+WORDS = (
+    "I feel we must not protect the innocent and very good outcome for a bad "
+    "future however maybe the logic is really flawed my profit matters never "
+    "happy sad terrible great duty calls compassion hurts long-term benefit"
+).split()
+
+
+def make_texts(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choices(WORDS, k=rng.randint(8, 60))) + rng.choice(".!?")
+        for _ in range(count)
+    ]
+
+
+def timed(label, fn):
+    # every run starts from an empty memo
+    analysis._sentiment_memo.clear()
+    start = time.perf_counter()
+    value = fn()
+    print(f"  {label:34} {time.perf_counter() - start:7.2f}s")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=20_000)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    textblob = analysis.TextBlobBackend()
+    pattern = analysis.PatternLexiconBackend()
+    print(f"{len(texts)} synthetic texts\n")
+
+    reference = timed(
+        "textblob, serial",
+        lambda: analysis.analyze_sentiments(texts, textblob, workers=1),
+    )
+    timed(
+        "pattern, serial",
+        lambda: analysis.analyze_sentiments(texts, pattern, workers=1),
+    )
+    parallel = timed(
+        "pattern, process pool",
+        lambda: analysis.analyze_sentiments(texts, pattern, workers=None),
+    )
+
+    # second call over the same texts is served from the memo
+    start = time.perf_counter()
+    analysis.analyze_sentiments(texts, pattern)
+    print(f"  {'pattern, memoized':34} {time.perf_counter() - start:7.2f}s")
+
+    assert parallel == reference
+    max_diff = analysis.compare_sentiment_backends(textblob, pattern, texts[:2000])
+    print(f"\nMax difference pattern vs textblob: {max_diff}")
+    assert max_diff == 0.0
+
+
+if __name__ == "__main__":
+    main()
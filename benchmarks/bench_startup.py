@@ -0,0 +1,134 @@
+"""
+Startup cost of the entry points, measured with `python -X importtime`.
+
+Fails (exit code 1) when an entry point takes longer than its budget to
+import, or pulls in one of the heavy libraries it should only load lazily.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --max-ms 500 --runs 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# entry point -> libraries it must not import at startup
+ENTRY_POINTS = {
+    "main": ["torch", "transformers", "matplotlib", "seaborn", "pandas", "textblob"],
+    "report": ["torch", "transformers", "matplotlib", "seaborn", "pandas", "textblob"],
+    "aggregate": ["torch", "transformers", "matplotlib", "seaborn", "pandas"],
+    "visualize_sentiment": ["torch", "transformers", "matplotlib", "seaborn"],
+    "config": ["torch", "transformers", "pandas"],
+    "backends": ["torch", "transformers", "matplotlib", "seaborn", "pandas"],
+}
+
+# run after the import, for entry points whose libraries are imported
+# lazily: a few requests through the openai backend against the stub server
+# (imports on that path count as startup imports too)
+ENTRY_POINT_RUNS = {
+    "backends": """
+import threading
+import profiles
+from stub_server import make_server
+
+profiles.USE_GENERATION_CACHE = False
+server = make_server(port=0)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+backend = backends.OpenAIBackend(
+    "stub", base_url=f"http://127.0.0.1:{server.server_port}/v1"
+)
+backend.load()
+backend.generate_batch(
+    [("You are a judge.", "Hello?")] * 3, roles=["persona", "synthesizer", "judge"]
+)
+backend.unload()
+server.shutdown()
+""",
+}
+
+
+def import_profile(module):
+    """
+    Returns ({imported module: cumulative µs}, total µs) for a fresh
+    interpreter importing module (and running its ENTRY_POINT_RUNS code).
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import {module}\n" + ENTRY_POINT_RUNS.get(module, ""),
+        ],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+
+    return cumulative, cumulative[module]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=300,
+        help="import time budget per entry point (median of --runs)",
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'entry point':22} {'median':>9}  slowest imports")
+
+    for module, forbidden in ENTRY_POINTS.items():
+        totals = []
+        for _ in range(args.runs):
+            cumulative, total_us = import_profile(module)
+            totals.append(total_us)
+
+        median_ms = statistics.median(totals) / 1000
+        # top-level children, the place to look when the budget is blown
+        slowest = sorted(
+            (name for name in cumulative if name != module and "." not in name),
+            key=cumulative.get,
+            reverse=True,
+        )[:3]
+        print(
+            f"{module:22} {median_ms:7.1f}ms  "
+            + ", ".join(f"{name} {cumulative[name] / 1000:.0f}ms" for name in slowest)
+        )
+
+        if median_ms > args.max_ms:
+            failures.append(f"{module}: {median_ms:.0f}ms > {args.max_ms:.0f}ms")
+
+        loaded = [name for name in forbidden if name in cumulative]
+        if loaded:
+            failures.append(f"{module}: imports {', '.join(loaded)} at startup")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+    print("\nAll entry points within budget.")
+
+
+if __name__ == "__main__":
+    main()
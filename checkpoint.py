@@ -0,0 +1,73 @@
+import json
+import os
+
+RUN_INFO_FILE = "run_info.json"
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+
+def write_run_info(output_dir, model_key, model_config, dilemmas):
+    # everything needed to pick the run up again with the same dilemmas
+    run_info = {
+        "model_key": model_key,
+        "model_config": model_config,
+        "dilemmas": dilemmas,
+    }
+    with open(os.path.join(output_dir, RUN_INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(run_info, f, ensure_ascii=False, indent=2)
+
+
+def load_run_info(output_dir):
+    with open(os.path.join(output_dir, RUN_INFO_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def append_checkpoint(output_dir, result):
+    """
+    Appends one finished dilemma result to the run's checkpoint file.
+    """
+    line = json.dumps(result, ensure_ascii=False)
+    with open(os.path.join(output_dir, CHECKPOINT_FILE), "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _drop_partial_line(path):
+    # a run that crashed mid-write leaves a last line without its newline.
+    # the next append_checkpoint would continue that line and the result
+    # it writes would be unreadable too, so the file is cut back to the
+    # last complete line
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            print(f"Warning: dropped a partially written checkpoint line in {path}")
+
+
+def load_checkpoint(output_dir, repair=False):
+    """
+    Returns every dilemma result saved so far, in the order they finished.
+
+    repair=True (when the run is resumed and appended to) also removes a
+    partially written last line from the file.
+    """
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return []
+
+    if repair:
+        _drop_partial_line(path)
+
+    results = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                # last line can be cut off if the run crashed mid-write
+                print(f"Warning: skipping unreadable checkpoint line in {path}")
+
+    return results
@@ -28,10 +28,102 @@ ACTIVE_MODELS = ["3B", "1B", "0.5B"]
 
 MODEL_CACHE_DIR = "./model_cache"
 
+# where models run: "cuda", "cuda:1", "cpu" or "cpu:0-3,8" (cpu pinned to cores)
+MODEL_DEVICE = "cuda"
+
+# cpu devices only: "float32" or "bfloat16" (faster on CPUs with AVX512-BF16/AMX)
+CPU_DTYPE = "float32"
+# dynamic int8 quantization of the linear layers (weights int8, activations
+# quantized on the fly), usually the biggest CPU speedup for small models
+CPU_QUANTIZE_INT8 = False
+# torch intra-op / inter-op threads on cpu, None = torch default
+# (or the size of the "cpu:<cores>" set)
+CPU_NUM_THREADS = None
+CPU_NUM_INTEROP_THREADS = None
+
+# run ACTIVE_MODELS at the same time, one worker process per model
+# (main.py --parallel-models does the same)
+PARALLEL_MODELS = False
+
+# per-model devices for parallel runs, models not listed use MODEL_DEVICE
+# e.g. {"3B": "cuda:0", "1B": "cuda:1", "0.5B": "cpu:0-7"}
+MODEL_DEVICES = {}
+
+# where generation happens: "hf" loads the weights in-process (above
+# settings), "openai" sends the prompts to an OpenAI-compatible server
+# (vLLM, llama.cpp, TGI, ... or stub_server.py for offline tests).
+# a model can override it with "backend", "base_url" and "served_name"
+# (the server's model name, defaults to its "id") in AVAILABLE_MODELS
+INFERENCE_BACKEND = "hf"
+OPENAI_BASE_URL = "http://127.0.0.1:8000/v1"
+OPENAI_API_KEY = None  # None = the OPENAI_API_KEY environment variable
+# pooled keep-alive connections, also the number of requests in flight
+OPENAI_MAX_CONNECTIONS = 8
+OPENAI_TIMEOUT = 300  # seconds per request
+
 MAX_NEW_TOKENS = 300  # Judge neededd more tokens to not cut off mid-sentence,
 TEMPERATURE = 0.7
 DO_SAMPLE = True
 
+# generation profile per role: token budget, sampling and early stopping.
+# generation stops at whichever limit is hit first (max_new_tokens,
+# max_sentences, or any of the stop_strings) and the response is cut back
+# to it. missing keys fall back to MAX_NEW_TOKENS / TEMPERATURE / DO_SAMPLE,
+# which are also what calls without a role use
+GENERATION_PROFILES = {
+    "persona": {
+        "max_new_tokens": 120,
+        "temperature": 0.7,
+        "do_sample": True,
+        "max_sentences": 2,
+    },
+    "synthesizer": {
+        "max_new_tokens": 200,
+        "temperature": 0.7,
+        "do_sample": True,
+        "max_sentences": 3,
+    },
+    "judge": {
+        "max_new_tokens": 300,
+        "temperature": 0.7,
+        "do_sample": True,
+    },
+}
+
+# how many prompts go into a single model.generate call (None = all at once)
+# lower it if batched generation runs out of VRAM
+GENERATION_BATCH_SIZE = 16
+
+# batch persona/synthesizer/judge requests of different dilemmas together
+# instead of finishing each dilemma before starting the next one
+CROSS_DILEMMA_BATCHING = True
+
+# reuse the KV cache of fixed system prompts across dilemmas
+USE_PREFIX_CACHE = True
+PREFIX_CACHE_MAX_MB = 512  # least recently used prefixes are dropped above this
+
+# asyncio driver: dilemmas run concurrently, each still persona ->
+# synthesizer -> judge, with at most ASYNC_CONCURRENCY requests in flight
+# (later stages get free slots first). meant for the "openai" backend,
+# in-process models keep batching. more requests in flight than pooled
+# connections would only queue in the client
+ASYNC_PIPELINE = False
+ASYNC_CONCURRENCY = OPENAI_MAX_CONNECTIONS
+
+# on-disk cache of generated responses, so re-runs and resumed runs
+# don't have to call the model again for prompts it already answered.
+# only used for greedy roles (do_sample False) or with a GENERATION_SEED,
+# unseeded sampling draws new responses on every run
+USE_GENERATION_CACHE = True
+GENERATION_CACHE_PATH = "./results/generation_cache.sqlite"
+GENERATION_CACHE_MAX_MB = 256  # least recently used entries are dropped above this
+
+# seed for sampling (None = different responses on every run)
+# part of the generation cache key. a seeded response also depends on the
+# batch it was generated in (which prompts share it, batch size, order), so
+# the same seed only reproduces runs with the same batching settings
+GENERATION_SEED = None
+
 # =================================================================================
 # PERSONA DEFINITIONS
 # =================================================================================
@@ -149,6 +241,33 @@ TEST_DILEMMAS = [
     },
 ]
 
+# ==============================================================================
+# ANALYSIS
+# ==============================================================================
+
+# "textblob" (reference) or "pattern" (same lexicon without TextBlob overhead)
+SENTIMENT_BACKEND = "textblob"
+
+# score sentiment in a process pool once this many new texts come in at once
+SENTIMENT_PARALLEL_THRESHOLD = 2000
+SENTIMENT_WORKERS = None  # None = one per CPU core
+
+# how charts are produced after each model finishes:
+# "parallel" (worker processes), "serial", "later" (save data only), "off"
+PLOT_MODE = "parallel"
+
+# also write results.parquet next to results.jsonl (needs pyarrow)
+RESULTS_PARQUET = True
+
+# record spans, counters and histograms (load, tokenize, prefill/decode,
+# analysis, charts), written to metrics.json in the run folder
+# (main.py --profile does the same)
+INSTRUMENTATION = False
+
+# cross-run store built by aggregate.py from every results/run_* folder
+RESULTS_DIR = "./results"
+AGGREGATE_STORE_PATH = "./results/index.sqlite"
+
 # ==============================================================================
 # DYNAMIC DILEMMA LOADING (Social Chemistry 101)
 # ==============================================================================
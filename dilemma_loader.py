@@ -1,3 +1,5 @@
+import hashlib
+import json
 import pandas as pd
 import random
 from pathlib import Path
@@ -8,7 +10,31 @@ SOCIAL_CHEM_PATH = (
     / "social-chem-101"
     / "social-chem-101.v1.0.tsv"
 )
+
+# filtered + deduplicated candidates, rebuilt when the TSV changes
+CANDIDATE_POOL_PATH = SOCIAL_CHEM_PATH.with_name("candidate_pool.parquet")
+CANDIDATE_POOL_META_PATH = SOCIAL_CHEM_PATH.with_name("candidate_pool.meta.json")
+
+# the only columns a dilemma needs once the quality filters were applied
+POOL_COLUMNS = ["area", "situation", "situation-short-id", "rot"]
+
+# columns (and their types) the quality filters look at, the rest of the
+# TSV is never parsed by the streaming loader
+FILTER_COLUMN_DTYPES = {
+    "area": "str",
+    "situation": "str",
+    "situation-short-id": "str",
+    "rot": "str",
+    # floats so empty cells can be read as NaN
+    "rot-bad": "float32",
+    "action-moral-judgment": "float32",
+    "rot-categorization": "str",
+}
+
+LOADER_CHUNKSIZE = 50_000
+
 _cached_df = None
+_cached_pool = None
 
 
 def load_social_chemistry_data():
@@ -27,60 +53,228 @@ def load_social_chemistry_data():
     return _cached_df
 
 
-def get_random_dilemmas(
-    num_dilemmas: int = 4, seed: int = None, categories: list = None
-) -> list:
-    df = load_social_chemistry_data()
-
-    if df is None:
-        return []
-
-    if seed is not None:
-        random.seed(seed)
-
-    if categories:
-        df = df[df["area"].isin(categories)]
-
+def filter_candidates(df):
     # Filtering for good quality entries:
     # - Not marked as "bad"
     # - Has a situation text of reasonable length
     # - Has moral/ethical categorization
     # - Action-moral-judgment exists
-    # - Preferably from "amitheasshole" (most dilemma-like)
-    df_filtered = df[
+    # cheap checks go first so string ops only run on rows that survived them
+    df = df[
         (df["rot-bad"] == 0)
         & (df["situation"].notna())
-        & (df["situation"].str.len() > 80)
-        & (df["situation"].str.len() < 400)
         & (df["rot"].notna())
         & (df["action-moral-judgment"].notna())  # has moral dimension
-        & (
-            df["rot-categorization"].str.contains(
-                "morality-ethics|social-norms", na=False
-            )
-        )  # Ethical/social norms
     ]
 
-    # Prefer "amitheasshole" category as it contains genuine ethical dilemmas
-    df_aita = df_filtered[df_filtered["area"] == "amitheasshole"]
+    situation_len = df["situation"].str.len()
+    df = df[(situation_len > 80) & (situation_len < 400)]
 
-    # If not enough AITA dilemmas, fall back to all filtered dilemmas
-    if len(df_aita) >= num_dilemmas * 3:
-        df_filtered = df_aita
+    # Ethical/social norms
+    is_ethical = df["rot-categorization"].str.contains(
+        "morality-ethics|social-norms", na=False
+    )
+    return df[is_ethical.astype(bool)]
+
+
+def iter_filtered_chunks(chunksize=LOADER_CHUNKSIZE):
+    """
+    Streams the TSV in chunks and yields only the filtered candidate rows.
+
+    Only FILTER_COLUMN_DTYPES columns are parsed, so peak memory depends on
+    the chunk size and the number of candidates, not on the file size.
+    Situations are deduplicated across chunks (first row wins).
+    """
+    seen_ids = set()
+
+    reader = pd.read_csv(
+        SOCIAL_CHEM_PATH,
+        sep="\t",
+        usecols=list(FILTER_COLUMN_DTYPES),
+        dtype=FILTER_COLUMN_DTYPES,
+        chunksize=chunksize,
+    )
+
+    for chunk in reader:
+        candidates = filter_candidates(chunk)
+        candidates = candidates[~candidates["situation-short-id"].isin(seen_ids)]
+        candidates = candidates.drop_duplicates(subset=["situation-short-id"])
+        seen_ids.update(candidates["situation-short-id"])
+
+        yield candidates[POOL_COLUMNS]
+
+
+def load_filtered_social_chemistry_data(chunksize=LOADER_CHUNKSIZE):
+    """
+    Column-pruned alternative to load_social_chemistry_data that returns
+    only the deduplicated candidates.
+    """
+    if not SOCIAL_CHEM_PATH.exists():
+        print(f"Warning: Social Chemistry 101 dataset not fosund at {SOCIAL_CHEM_PATH}")
+        return None
+
+    print("Loading Social Chemistry 101 dataset (filtered, streaming)...")
+    df = pd.concat(iter_filtered_chunks(chunksize), ignore_index=True)
+    print(f"Loaded {len(df)} candidate entries.")
+    return df
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _candidate_pool_is_fresh():
+    if not CANDIDATE_POOL_PATH.exists() or not CANDIDATE_POOL_META_PATH.exists():
+        return False
+
+    meta = json.loads(CANDIDATE_POOL_META_PATH.read_text(encoding="utf-8"))
+    stat = SOCIAL_CHEM_PATH.stat()
+
+    if meta["source_mtime"] == stat.st_mtime and meta["source_size"] == stat.st_size:
+        return True
+
+    # mtime changes on copies/touches too, only the content hash really counts
+    if meta["source_sha256"] != _file_sha256(SOCIAL_CHEM_PATH):
+        return False
+
+    meta["source_mtime"] = stat.st_mtime
+    CANDIDATE_POOL_META_PATH.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return True
+
+
+def build_candidate_pool():
+    """
+    One-time preprocessing: filters the full TSV down to the deduplicated
+    candidate situations and stores them as a compact Parquet file.
+    """
+    pool = load_filtered_social_chemistry_data()
+    if pool is None:
+        return None
 
-    unique_situations = df_filtered.drop_duplicates(subset=["situation-short-id"])
+    print("Building Social Chemistry 101 candidate pool...")
+    pool["area"] = pool["area"].astype("category")
+    pool.to_parquet(CANDIDATE_POOL_PATH, index=False)
 
-    if len(unique_situations) < num_dilemmas:
-        print(f"Warning: Only {len(unique_situations)} unique situations available")
-        sample = unique_situations
+    stat = SOCIAL_CHEM_PATH.stat()
+    meta = {
+        "source_mtime": stat.st_mtime,
+        "source_size": stat.st_size,
+        "source_sha256": _file_sha256(SOCIAL_CHEM_PATH),
+        "rows": len(pool),
+    }
+    CANDIDATE_POOL_META_PATH.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    print(f"Saved {len(pool)} candidates to {CANDIDATE_POOL_PATH}")
+    return pool
+
+
+def load_candidate_pool():
+    global _cached_pool
+
+    if _cached_pool is not None:
+        return _cached_pool
+
+    if not SOCIAL_CHEM_PATH.exists():
+        print(f"Warning: Social Chemistry 101 dataset not fosund at {SOCIAL_CHEM_PATH}")
+        return None
+
+    if _candidate_pool_is_fresh():
+        _cached_pool = pd.read_parquet(CANDIDATE_POOL_PATH)
     else:
-        sample = unique_situations.sample(n=num_dilemmas)
+        _cached_pool = build_candidate_pool()
+
+    return _cached_pool
+
+
+def iter_candidate_rows(use_pool=True):
+    """
+    Yields (area, situation, situation-short-id, rot) for every candidate,
+    from the cached pool or straight from the TSV (one chunk at a time).
+    """
+    if use_pool:
+        pool = load_candidate_pool()
+        if pool is not None:
+            yield from pool[POOL_COLUMNS].itertuples(index=False, name=None)
+        return
+
+    if not SOCIAL_CHEM_PATH.exists():
+        print(f"Warning: Social Chemistry 101 dataset not fosund at {SOCIAL_CHEM_PATH}")
+        return
+
+    for chunk in iter_filtered_chunks():
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def _reservoir_add(reservoir, seen_count, item, size, rng):
+    # Algorithm R: the i-th item replaces a random slot with probability size/i
+    if seen_count <= size:
+        reservoir.append(item)
+        return
+
+    slot = rng.randrange(seen_count)
+    if slot < size:
+        reservoir[slot] = item
+
+
+def sample_candidates(rows, num_dilemmas, seed=None, categories=None):
+    """
+    Single-pass, deterministic (for a given seed and row order) selection
+    of num_dilemmas unique situations.
+
+    AITA situations and all situations are sampled into two reservoirs at
+    the same time, so the AITA preference can be decided at the end without
+    keeping any filtered frame around.
+    """
+    rng = random.Random(seed)
+    seen_ids = set()
+
+    aita_sample, aita_count = [], 0
+    all_sample, all_count = [], 0
+
+    for row in rows:
+        area, _, situation_short_id, _ = row
+
+        if categories and area not in categories:
+            continue
+        if situation_short_id in seen_ids:
+            continue
+        seen_ids.add(situation_short_id)
+
+        all_count += 1
+        _reservoir_add(all_sample, all_count, row, num_dilemmas, rng)
+
+        # Prefer "amitheasshole" category as it contains genuine ethical dilemmas
+        if area == "amitheasshole":
+            aita_count += 1
+            _reservoir_add(aita_sample, aita_count, row, num_dilemmas, rng)
+
+    # If not enough AITA dilemmas, fall back to all filtered dilemmas
+    if aita_count >= num_dilemmas * 3:
+        return aita_sample
+
+    if all_count < num_dilemmas:
+        print(f"Warning: Only {all_count} unique situations available")
+
+    return all_sample
+
+
+def get_random_dilemmas(
+    num_dilemmas: int = 4,
+    seed: int = None,
+    categories: list = None,
+    use_pool: bool = True,
+) -> list:
+    sample = sample_candidates(
+        iter_candidate_rows(use_pool), num_dilemmas, seed=seed, categories=categories
+    )
 
     # converting to dilemma format
     dilemmas = []
-    for idx, (_, row) in enumerate(sample.iterrows(), start=100):
-        situation = row["situation"]
-        rot = row["rot"]
+    for idx, (area, situation, _, rot) in enumerate(sample, start=100):
 
         # creating a concise title from situation and
         # using the first sentence as the title
@@ -102,7 +296,7 @@ def get_random_dilemmas(
                 "title": title,
                 "description": description,
                 "source": "social-chem-101",
-                "category": row["area"],
+                "category": area,
                 "rot": rot,
             }
         )
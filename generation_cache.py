@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from config import (
+    GENERATION_CACHE_PATH,
+    GENERATION_CACHE_MAX_MB,
+)
+
+
+def make_cache_key(model_id, system_prompt, user_message, sampling_params, seed):
+    """
+    Content hash of everything that determines a generation.
+    """
+    payload = json.dumps(
+        [model_id, system_prompt, user_message, sampling_params, seed],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    On-disk (SQLite) cache of model responses keyed by make_cache_key().
+
+    Entries that weren't used for the longest time are evicted once the
+    stored responses go over max_bytes.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # the async driver generates in a worker thread, the cache is still
+        # only used by one thread at a time
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )""")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_used ON generations (last_used)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys):
+        """Returns {key: response} for every key found in the cache."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        # staying well under SQLite's bound-parameter limit
+        for start in range(0, len(unique_keys), 500):
+            chunk = unique_keys[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, response FROM generations WHERE key IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            self.conn.executemany(
+                "UPDATE generations SET last_used = ? WHERE key = ?",
+                [(time.time(), key) for key in found],
+            )
+            self.conn.commit()
+
+        self.hits += sum(1 for key in keys if key in found)
+        self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO generations (key, response, size, last_used) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (key, response, len(response.encode("utf-8")), now)
+                for key, response in items
+            ],
+        )
+        self.conn.commit()
+        self._evict()
+
+    def put(self, key, response):
+        self.put_many([(key, response)])
+
+    def _evict(self):
+        total = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+
+        # least recently used first, until we are back under the limit
+        rows = self.conn.execute(
+            "SELECT key, size FROM generations ORDER BY last_used ASC"
+        )
+        to_delete = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+
+        self.conn.executemany("DELETE FROM generations WHERE key = ?", to_delete)
+        self.conn.commit()
+        self.evictions += len(to_delete)
+
+    def size_bytes(self):
+        return self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM generations"
+        ).fetchone()[0]
+
+    def stats(self):
+        entries = self.conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_mb": self.size_bytes() / (1024 * 1024),
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+_cache = None
+
+
+def get_generation_cache():
+    global _cache
+
+    if _cache is None:
+        _cache = GenerationCache(
+            GENERATION_CACHE_PATH, GENERATION_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _cache
+
+
+def print_generation_cache_stats():
+    if _cache is None:
+        return
+
+    stats = _cache.stats()
+    print("\nGeneration cache:")
+    print("-" * 40)
+    print(
+        f"  hits: {stats['hits']}, misses: {stats['misses']} "
+        f"({stats['hit_rate']:.0%} hit rate)"
+    )
+    print(
+        f"  entries: {stats['entries']}, size: {stats['size_mb']:.1f} MB, "
+        f"evictions: {stats['evictions']}"
+    )
@@ -0,0 +1,133 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+from config import INSTRUMENTATION
+
+# spans, counters and histograms of the current model run, keyed by
+# (name, sorted labels). everything below is a no-op while disabled, the
+# hot paths only pay for one flag check
+enabled = INSTRUMENTATION
+
+_counters = {}
+_histograms = {}
+_NOOP_SPAN = nullcontext()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    _counters.clear()
+    _histograms.clear()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def count(name, value=1, **labels):
+    if not enabled:
+        return
+    key = _key(name, labels)
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    if not enabled:
+        return
+    _histograms.setdefault(_key(name, labels), []).append(value)
+
+
+@contextmanager
+def _timed(name, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def span(name, **labels):
+    """
+    Times the with-block into the histogram "<name>" (seconds).
+    """
+    if not enabled:
+        return _NOOP_SPAN
+    return _timed(name, labels)
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def _summarize(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "sum": sum(values),
+        "min": values[0],
+        "p50": _percentile(values, 0.5),
+        "p95": _percentile(values, 0.95),
+        "max": values[-1],
+    }
+
+
+def snapshot():
+    """Counters and summarized histograms as plain JSON types."""
+    return {
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ],
+        "histograms": [
+            {"name": name, "labels": dict(labels), **_summarize(values)}
+            for (name, labels), values in sorted(_histograms.items())
+        ],
+    }
+
+
+def export_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+    print(f"Metrics saved to: {path}")
+
+
+def _label_text(labels):
+    return ",".join(f"{k}={v}" for k, v in labels) or "-"
+
+
+def print_summary():
+    if not _counters and not _histograms:
+        return
+
+    print("\nInstrumentation:")
+    print("-" * 40)
+    print(
+        f"  {'span / histogram':24} {'labels':44} {'count':>6} {'total':>9} "
+        f"{'p50':>9} {'p95':>9}"
+    )
+    for (name, labels), values in sorted(_histograms.items()):
+        stats = _summarize(values)
+        print(
+            f"  {name:24} {_label_text(labels):44} {stats['count']:6} "
+            f"{stats['sum']:9.3f} {stats['p50']:9.4f} {stats['p95']:9.4f}"
+        )
+
+    print(f"\n  {'counter':24} {'labels':44} {'value':>9}")
+    for (name, labels), value in sorted(_counters.items()):
+        print(f"  {name:24} {_label_text(labels):44} {value:9}")
+
+    # tokens/sec per role, the number people usually ask for
+    for (name, labels), seconds in sorted(_histograms.items()):
+        if name != "decode_s":
+            continue
+        tokens = _counters.get(("decode_tokens", labels), 0)
+        if sum(seconds):
+            print(
+                f"  {'decode tokens/s':24} {_label_text(labels):44} "
+                f"{tokens / sum(seconds):9.1f}"
+            )
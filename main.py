@@ -1,5 +1,11 @@
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 from config import (
@@ -11,17 +17,33 @@ from config import (
     DILEMMA_SEED,
     AVAILABLE_MODELS,
     ACTIVE_MODELS,
+    CROSS_DILEMMA_BATCHING,
+    ASYNC_PIPELINE,
+    PLOT_MODE,
+    MODEL_DEVICE,
+    MODEL_DEVICES,
+    PARALLEL_MODELS,
+    INSTRUMENTATION,
+    INFERENCE_BACKEND,
+    OPENAI_BASE_URL,
 )
-from dilemma_loader import get_all_dilemmas
-from model_engine import load_model, generate_response, unload_model
-from analysis import (
-    analyze_persona_response,
-    analyze_sentiment,
-    print_analysis_summary,
-    print_llm_affiliation_summary,
-    print_sentiment_summary,
+import instrumentation
+from backends import get_backend
+from generation_cache import print_generation_cache_stats
+from prompts import build_persona_prompt, build_synthesizer_prompt, build_judge_prompt
+from scheduler import run_async, run_scheduled
+from analysis import annotate_result, annotate_results
+from visualization import create_output_dir, shutdown_render_pool, wait_for_plots
+from report import write_report
+
+# save_results lived here before, kept importable for existing callers
+from report import save_results  # noqa: F401
+from checkpoint import (
+    write_run_info,
+    load_run_info,
+    append_checkpoint,
+    load_checkpoint,
 )
-from visualization import generate_visual_report, extract_winner
 
 
 def parse_judge_ratings(verdict_text):
@@ -89,151 +111,216 @@ def get_models_to_run():
     return models
 
 
-def run_pipeline_for_model(model_key, model_config, dilemmas):
-    model_name = model_config["name"]
-    model_id = model_config["id"]
-
-    print_header(f"MODEL: {model_name} ({model_key})")
-    print(f"HuggingFace ID: {model_id}")
-    print(f"Description: {model_config['description']}")
-
-    # =========================================================================
-    # STEP 1: Load the model
-    # =========================================================================
-    print_header(f"STEP 1: Loading {model_name}")
-    model, tokenizer = load_model(model_id)
+def run_dilemma(backend, dilemma):
+    start_time = time.perf_counter()
 
-    # store all results for this models' final summary
-    all_results = []
+    # personas go through one batched generate call
+    user_prompt = build_persona_prompt(dilemma)
+    persona_responses = backend.generate_batch(
+        [
+            (persona_config["system_prompt"], user_prompt)
+            for persona_config in PERSONAS.values()
+        ],
+        roles="persona",
+    )
+    opinions = dict(zip(PERSONAS.keys(), persona_responses))
 
-    # =========================================================================
-    # STEP 2: Process each dilemma
-    # =========================================================================
-    for dilemma in dilemmas:
-        print_header(f"[{model_key}] DILEMMA {dilemma['id']}: {dilemma['title']}")
-        print(f"\n{dilemma['description']}")
+    synth_response = backend.generate(
+        SYNTHESIZER_SYSTEM_PROMPT,
+        build_synthesizer_prompt(dilemma, opinions),
+        role="synthesizer",
+    )
 
-        # store opinions from each persona
-        opinions = {}
+    judge_verdict = backend.generate(
+        JUDGE_SYSTEM_PROMPT,
+        build_judge_prompt(dilemma, opinions, synth_response),
+        role="judge",
+    )
 
-        # ---------------------------------------------------------------------
-        # STEP 2a: Get opinion from each persona
-        # ---------------------------------------------------------------------
-        for persona_name, persona_config in PERSONAS.items():
-            print_subheader(f"Persona: {persona_name}")
+    elapsed = time.perf_counter() - start_time
+    return dilemma, opinions, synth_response, judge_verdict, elapsed
 
-            # generate opinion
-            user_prompt = f"Dilemma: {dilemma['description']}\n\nGive your verdict in 1-2 sentences. Be direct."
 
-            response = generate_response(
-                model, tokenizer, persona_config["system_prompt"], user_prompt
-            )
+def print_dilemma_outcome(model_key, result):
+    print_header(
+        f"[{model_key}] DILEMMA {result['dilemma_id']}: {result['dilemma_title']}"
+    )
+    print(f"\n{result['dilemma_description']}")
 
-            opinions[persona_name] = response
+    # -------------------------------------------------------------------------
+    # Persona opinions + Synthesizer's hybrid solution
+    # -------------------------------------------------------------------------
+    for persona_name, response in result["opinions"].items():
+        print_subheader(f"Persona: {persona_name}")
 
-            # print the response
-            print(f"\n{persona_name}'s Opinion:")
-            print("-" * 40)
-            print(response[:500] + "..." if len(response) > 500 else response)
+        # print the response
+        print(f"\n{persona_name}'s Opinion:")
+        print("-" * 40)
+        print(response[:500] + "..." if len(response) > 500 else response)
 
-            # analyze how well they stayed in character
-            analysis = analyze_persona_response(persona_name, response)
-            print(f"\nControllability Score: {analysis['score']:.2f}/1.00")
-            print(f"Keywords found: {', '.join(analysis['keywords_found'][:5])}")
+        # how well they stayed in character
+        record = result["analysis"][persona_name]
+        print(f"\nControllability Score: {record['score']:.2f}/1.00")
+        print(f"Keywords found: {', '.join(record['keywords_found'][:5])}")
 
-        # ---------------------------------------------------------------------
-        # STEP 2b: Synthesizer creates hybrid solution from all opinions
-        # ---------------------------------------------------------------------
-        print_subheader("Persona: Synthesizer")
+    # -------------------------------------------------------------------------
+    # Judge's evaluation
+    # -------------------------------------------------------------------------
+    print_subheader("JUDGE'S EVALUATION")
 
-        # building prompt with all perssona opinions
-        synth_opinions_text = "\n\n".join(
-            [f"{name}: {opinions[name]}" for name in PERSONAS.keys()]
-        )
+    judge_verdict = result["judge_verdict"]
+    print("\nJudge's Verdict:")
+    print("-" * 40)
+    print(judge_verdict[:800] + "..." if len(judge_verdict) > 800 else judge_verdict)
 
-        synth_prompt = f"""Dilemma: {dilemma["description"]}
+    if result["llm_ratings"]:
+        print("\nLLM Affiliation Ratings:")
+        for persona, rating in result["llm_ratings"].items():
+            print(f"  {persona}: {rating}/10")
 
-Here are the perspectives from different personas:
 
-{synth_opinions_text}
+def finish_dilemma(model_key, model_name, output_dir, completed):
+    """
+    Turns a finished (dilemma, opinions, synth_response, judge_verdict,
+    elapsed_s) into an analyzed result and checkpoints it.
+    """
+    dilemma, opinions, synth_response, judge_verdict, elapsed = completed
+
+    # get affiliation ratings from the verdict
+    llm_ratings = parse_judge_ratings(judge_verdict)
+
+    # now adding synthesizer to opinions so it gets saved in results
+    opinions["Synthesizer"] = synth_response
+
+    result = {
+        "dilemma_id": dilemma["id"],
+        "dilemma_title": dilemma["title"],
+        "dilemma_description": dilemma["description"],
+        "opinions": opinions,
+        "judge_verdict": judge_verdict,
+        "llm_ratings": llm_ratings,
+        "model_key": model_key,
+        "model_name": model_name,
+        "elapsed_s": round(elapsed, 3),
+    }
+    # scores, sentiment, word counts and the winner, computed once
+    with instrumentation.span("analysis_s"):
+        annotate_result(result)
+
+    print_dilemma_outcome(model_key, result)
+
+    append_checkpoint(output_dir, result)
+    return result
+
+
+async def run_dilemmas_async(backend, dilemmas, on_finished):
+    # analysis and checkpointing of finished dilemmas run in a worker
+    # thread, so the event loop keeps sending requests in the meantime
+    loop = asyncio.get_running_loop()
+    async for completed in run_async(backend, dilemmas):
+        await loop.run_in_executor(None, on_finished, completed)
+
+
+def save_metrics(output_dir):
+    # instrumentation of this model run, only when it was switched on
+    if not instrumentation.enabled:
+        return
+    # chart times are only known once the render workers are done
+    wait_for_plots()
+    instrumentation.print_summary()
+    instrumentation.export_json(os.path.join(output_dir, "metrics.json"))
+
+
+def run_pipeline_for_model(
+    model_key,
+    model_config,
+    dilemmas,
+    output_dir=None,
+    completed_results=None,
+    plot_mode=PLOT_MODE,
+    report=True,
+    device=None,
+):
+    model_name = model_config["name"]
+    model_id = model_config["id"]
 
-Create a HYBRID solution that combines the best elements. Be decisive."""
+    instrumentation.reset()
 
-        synth_response = generate_response(
-            model, tokenizer, SYNTHESIZER_SYSTEM_PROMPT, synth_prompt
-        )
+    print_header(f"MODEL: {model_name} ({model_key})")
+    print(f"HuggingFace ID: {model_id}")
+    print(f"Description: {model_config['description']}")
 
-        print("\nSynthesizer's Opinion:")
-        print("-" * 40)
-        print(
-            synth_response[:500] + "..."
-            if len(synth_response) > 500
-            else synth_response
-        )
+    # every finished dilemma is checkpointed into the run folder right away
+    if output_dir is None:
+        output_dir = create_output_dir(model_key=model_key)
+        write_run_info(output_dir, model_key, model_config, dilemmas)
 
-        # analyzing Synthesizer affiliation
-        analysis = analyze_persona_response("Synthesizer", synth_response)
-        print(f"\nControllability Score: {analysis['score']:.2f}/1.00")
-        print(f"Keywords found: {', '.join(analysis['keywords_found'][:5])}")
+    # store all results for this models' final summary
+    all_results = list(completed_results or [])
 
-        # ---------------------------------------------------------------------
-        # STEP 2c: Judge evaluates all opinions
-        # ---------------------------------------------------------------------
-        print_subheader("JUDGE'S EVALUATION")
+    finished_ids = {result["dilemma_id"] for result in all_results}
+    remaining = [dilemma for dilemma in dilemmas if dilemma["id"] not in finished_ids]
 
-        # build the judge's prompt with all opinions dynamically
-        # Synthesizer isnt in opinions dict yet, so it won't be listed as a candidate
-        opinions_text = "\n\n".join(
-            [f"{name.upper()}: {opinions[name]}" for name in opinions.keys()]
+    if finished_ids:
+        print(
+            f"Resuming: {len(finished_ids)} dilemmas already done, {len(remaining)} left"
         )
 
-        judge_prompt = f"""Dilemma: {dilemma["description"]}
-
-{opinions_text}
-
-ADVISOR (SYNTHESIZER) RECOMMENDATION:
-{synth_response}
-
-Rate each persona's affiliation to their role (1-10) and declare the winner.
-REMEMBER: The Synthesizer is your advisor, NOT a contestant."""
-
-        judge_verdict = generate_response(
-            model, tokenizer, JUDGE_SYSTEM_PROMPT, judge_prompt
+    if remaining:
+        # =====================================================================
+        # STEP 1: Load the model (or connect to its server)
+        # =====================================================================
+        print_header(f"STEP 1: Loading {model_name}")
+        backend = get_backend(
+            model_config, device or MODEL_DEVICES.get(model_key, MODEL_DEVICE)
         )
+        backend.load()
 
-        # now adding synthesizer to opinions so it gets saved in results
-        opinions["Synthesizer"] = synth_response
+        # =====================================================================
+        # STEP 2: Process each dilemma (persona -> synthesizer -> judge)
+        # =====================================================================
+        if ASYNC_PIPELINE:
+            asyncio.run(
+                run_dilemmas_async(
+                    backend,
+                    remaining,
+                    lambda completed: all_results.append(
+                        finish_dilemma(model_key, model_name, output_dir, completed)
+                    ),
+                )
+            )
+        else:
+            if CROSS_DILEMMA_BATCHING:
+                # stages of different dilemmas share batches, results come
+                # back in completion order
+                completed_dilemmas = run_scheduled(backend, remaining)
+            else:
+                completed_dilemmas = (
+                    run_dilemma(backend, dilemma) for dilemma in remaining
+                )
+
+            for completed in completed_dilemmas:
+                all_results.append(
+                    finish_dilemma(model_key, model_name, output_dir, completed)
+                )
+
+        backend.print_stats()
+        print_generation_cache_stats()
 
-        # get affiliation ratings from the verdict
-        llm_ratings = parse_judge_ratings(judge_verdict)
+        # =====================================================================
+        # STEP 3: Unload model to free GPU memory for next model
+        # =====================================================================
+        backend.unload()
 
-        print("\nJudge's Verdict:")
-        print("-" * 40)
-        print(
-            judge_verdict[:800] + "..." if len(judge_verdict) > 800 else judge_verdict
-        )
+    # results resumed from an older checkpoint may not be analyzed yet
+    annotate_results(all_results)
 
-        if llm_ratings:
-            print("\nLLM Affiliation Ratings:")
-            for persona, rating in llm_ratings.items():
-                print(f"  {persona}: {rating}/10")
-
-        # store result
-        all_results.append(
-            {
-                "dilemma_id": dilemma["id"],
-                "dilemma_title": dilemma["title"],
-                "dilemma_description": dilemma["description"],
-                "opinions": opinions,
-                "judge_verdict": judge_verdict,
-                "llm_ratings": llm_ratings,
-                "model_key": model_key,
-                "model_name": model_name,
-            }
-        )
+    # keep reports in dilemma order no matter how the stages were scheduled
+    dilemma_order = {dilemma["id"]: i for i, dilemma in enumerate(dilemmas)}
+    all_results.sort(key=lambda result: dilemma_order[result["dilemma_id"]])
 
     # =========================================================================
-    # STEP 3: Generate a summmary and save results for this model
+    # STEP 4: Generate a summmary and save results for this model
     # =========================================================================
     print_header(f"SUMMARY FOR {model_name}")
     print(f"\nProcessed {len(dilemmas)} dilemmas")
@@ -241,24 +328,151 @@ REMEMBER: The Synthesizer is your advisor, NOT a contestant."""
         f"Used {len(PERSONAS)} personas + Synthesizer: {', '.join(PERSONAS.keys())}, Synthesizer"
     )
 
-    print_analysis_summary(all_results)
-    print_llm_affiliation_summary(all_results)
-    print_sentiment_summary(all_results)
+    if not report:
+        print(f"\nReport skipped, build it later with: python report.py {output_dir}")
+        save_metrics(output_dir)
+        return all_results, output_dir
+
+    # charts keep rendering in the background while the next model loads
+    write_report(
+        all_results,
+        output_dir,
+        model_key=model_key,
+        model_name=model_name,
+        plot_mode=plot_mode,
+        wait_for_charts=False,
+    )
+    save_metrics(output_dir)
 
-    output_dir = generate_visual_report(all_results, model_key=model_key)
+    return all_results, output_dir
 
-    # save text results to the same folder
-    save_results(all_results, output_dir, model_name=model_name)
 
-    # =========================================================================
-    # STEP 4: Unload model to free GPU memory for next model
-    # =========================================================================
-    unload_model(model, tokenizer)
+def _run_model_worker(
+    model_key, model_config, dilemmas, output_dir, device, plot_mode, report, profile
+):
+    # runs in its own process, output goes to the run folder instead of
+    # being interleaved with the other models
+    if model_config.get("backend", INFERENCE_BACKEND) == "hf":
+        # cpu pinning is for torch's threads, a server client doesn't need
+        # torch at all
+        from model_engine import pin_process
+
+        pin_process(device)
+    instrumentation.enable(profile)
+
+    log_path = os.path.join(output_dir, "run.log")
+    with open(log_path, "w", encoding="utf-8", buffering=1) as log:
+        with contextlib.redirect_stdout(log):
+            results, _ = run_pipeline_for_model(
+                model_key,
+                model_config,
+                dilemmas,
+                output_dir=output_dir,
+                plot_mode=plot_mode,
+                report=report,
+                device=device,
+            )
+            wait_for_plots()
+            shutdown_render_pool()
 
-    return all_results, output_dir
+    return results
+
+
+def run_models_concurrently(models_to_run, dilemmas, plot_mode=PLOT_MODE, report=True):
+    """
+    Runs every model in its own worker process on its MODEL_DEVICES device,
+    all on the same dilemmas. Returns {model_key: {"results", "output_dir"}}
+    once every model is done, smaller models report back as soon as they
+    finish.
+    """
+    all_model_results = {}
+    futures = {}
+
+    # spawn: CUDA can't be used in forked children
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(len(models_to_run), mp_context=context) as pool:
+        for model_key, model_config in models_to_run:
+            device = MODEL_DEVICES.get(model_key, MODEL_DEVICE)
+
+            output_dir = create_output_dir(model_key=model_key)
+            write_run_info(output_dir, model_key, model_config, dilemmas)
+
+            future = pool.submit(
+                _run_model_worker,
+                model_key,
+                model_config,
+                dilemmas,
+                output_dir,
+                device,
+                plot_mode,
+                report,
+                instrumentation.enabled,
+            )
+            futures[future] = (model_key, output_dir)
+            print(f"  - {model_key} started on {device}, log: {output_dir}/run.log")
+
+        for future in as_completed(futures):
+            model_key, output_dir = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"\n✗ {model_key} failed: {e} (see {output_dir}/run.log)")
+                continue
+
+            all_model_results[model_key] = {
+                "results": results,
+                "output_dir": output_dir,
+            }
+            print(f"\n✓ Completed {model_key}, results saved to: {output_dir}")
+
+    return all_model_results
+
+
+def print_dry_run(models_to_run, dilemmas, parallel):
+    # everything a real run would use, without loading a model
+    from config import GENERATION_PROFILES
+
+    print_header("DRY RUN")
+    print(f"\nModels run {'concurrently' if parallel else 'one after another'}:")
+    for key, config in models_to_run:
+        if config.get("backend", INFERENCE_BACKEND) == "openai":
+            where = config.get("base_url", OPENAI_BASE_URL)
+        else:
+            where = MODEL_DEVICES.get(key, MODEL_DEVICE)
+        print(f"  - {key}: {config['id']} on {where}")
+
+    print("\nGeneration profiles:")
+    for role, profile in GENERATION_PROFILES.items():
+        print(f"  - {role}: {profile}")
+
+    print("\nDilemmas:")
+    for dilemma in dilemmas:
+        print(f"  {dilemma['id']:4} {dilemma['title'][:70]}")
+
+
+def run_models_sequentially(models_to_run, dilemmas, plot_mode=PLOT_MODE, report=True):
+    # running pipeline for each model sequentially
+    all_model_results = {}
+
+    for i, (model_key, model_config) in enumerate(models_to_run, 1):
+        print_header(f"RUNNING MODEL {i}/{len(models_to_run)}: {model_key}")
+
+        results, output_dir = run_pipeline_for_model(
+            model_key, model_config, dilemmas, plot_mode=plot_mode, report=report
+        )
+        all_model_results[model_key] = {
+            "results": results,
+            "output_dir": output_dir,
+        }
+
+        print(f"\n✓ Completed {model_key}, results saved to: {output_dir}")
+
+    return all_model_results
 
 
-def run_pipeline():
+def run_pipeline(
+    plot_mode=PLOT_MODE, report=True, parallel=PARALLEL_MODELS, dry_run=False
+):
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     models_to_run = get_models_to_run()
@@ -272,6 +486,8 @@ def run_pipeline():
     for key, config in models_to_run:
         print(f"  - {key}: {config['name']} ({config['description']})")
 
+    from dilemma_loader import get_all_dilemmas
+
     # Load dilemmas once (shared across all models)
     dilemmas = get_all_dilemmas(
         base_dilemmas=TEST_DILEMMAS,
@@ -282,19 +498,26 @@ def run_pipeline():
         f"\nLoaded {len(dilemmas)} dilemmas ({len(TEST_DILEMMAS)} base + {len(dilemmas) - len(TEST_DILEMMAS)} from Social Chemistry 101)"
     )
 
-    # running pipeline for each model sequentially
-    all_model_results = {}
-
-    for i, (model_key, model_config) in enumerate(models_to_run, 1):
-        print_header(f"RUNNING MODEL {i}/{len(models_to_run)}: {model_key}")
+    if dry_run:
+        print_dry_run(models_to_run, dilemmas, parallel)
+        return
 
-        results, output_dir = run_pipeline_for_model(model_key, model_config, dilemmas)
-        all_model_results[model_key] = {
-            "results": results,
-            "output_dir": output_dir,
+    if parallel and len(models_to_run) > 1:
+        print_header("RUNNING MODELS CONCURRENTLY")
+        finished = run_models_concurrently(
+            models_to_run, dilemmas, plot_mode=plot_mode, report=report
+        )
+        # keep the final listing in ACTIVE_MODELS order
+        all_model_results = {
+            key: finished[key] for key, _ in models_to_run if key in finished
         }
+    else:
+        all_model_results = run_models_sequentially(
+            models_to_run, dilemmas, plot_mode=plot_mode, report=report
+        )
 
-        print(f"\n✓ Completed {model_key}, results saved to: {output_dir}")
+    wait_for_plots()
+    shutdown_render_pool()
 
     print_header("ALL MODELS COMPLETED")
     print(f"\nCompleted at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -303,155 +526,91 @@ def run_pipeline():
         print(f"\n  {model_key}: {data['output_dir']}")
 
 
-def save_results(results, output_dir=None, model_name=None):
-    if output_dir is None:
-        os.makedirs("results", exist_ok=True)
-        output_dir = "results"
-        filename = os.path.join(
-            output_dir, f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        )
-    else:
-        filename = os.path.join(output_dir, "report.txt")
-
-    model_info = f"({model_name})" if model_name else ""
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write("=" * 60 + "\n")
-        f.write(f"  RESULTS REPORT {model_info}\n")
-        f.write(f"  Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 60 + "\n\n")
-
-        for result in results:
-            # full title (not truncated)
-            f.write(f"DILEMMA {result['dilemma_id']}: {result['dilemma_title']}\n")
-            f.write("-" * 40 + "\n")
-            # + full description
-            if result.get("dilemma_description"):
-                f.write(f"\n{result['dilemma_description']}\n")
-            f.write("\n")
-
-            for persona, opinion in result["opinions"].items():
-                f.write(f"{persona}:\n{opinion}\n\n")
-
-            f.write(f"JUDGE'S VERDICT:\n{result['judge_verdict']}\n\n")
-
-            if result.get("llm_ratings"):
-                f.write("LLM AFFILIATION RATINGS:\n")
-                for persona, rating in result["llm_ratings"].items():
-                    f.write(f"  - {persona}: {rating}/10\n")
-                f.write("\n")
-
-            f.write("=" * 60 + "\n\n")
+def resume_runs(run_dirs, plot_mode=PLOT_MODE, report=True):
+    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-        # =====================================================================
-        # SUMMARY SECTION
-        # =====================================================================
-        f.write("\n")
-        f.write("=" * 60 + "\n")
-        f.write("  FINAL SUMMARY\n")
-        f.write("=" * 60 + "\n\n")
-
-        f.write(f"Total dilemmas processed: {len(results)}\n")
-        f.write(f"Personas used: {', '.join(PERSONAS.keys())}, Synthesizer\n\n")
-
-        f.write("CONTROLLABILITY ANALYSIS (Keyword-based):\n")
-        f.write("-" * 40 + "\n")
-        persona_scores = {}
-        for result in results:
-            for persona_name, opinion in result["opinions"].items():
-                analysis = analyze_persona_response(persona_name, opinion)
-                if persona_name not in persona_scores:
-                    persona_scores[persona_name] = []
-                persona_scores[persona_name].append(analysis["score"])
-
-        for persona_name, scores in persona_scores.items():
-            if scores:
-                avg_score = sum(scores) / len(scores)
-                bar = "#" * int(avg_score * 20) + " " * (20 - int(avg_score * 20))
-                f.write(f"{persona_name:14} [{bar}] {avg_score:.2%}\n")
-
-        f.write("\nLLM AFFILIATION RATINGS (Judge-Rated):\n")
-        f.write("-" * 40 + "\n")
-        llm_persona_scores = {}
-        for result in results:
-            llm_ratings = result.get("llm_ratings", {})
-            for persona_name, rating in llm_ratings.items():
-                if persona_name not in llm_persona_scores:
-                    llm_persona_scores[persona_name] = []
-                llm_persona_scores[persona_name].append(rating)
-
-        if llm_persona_scores:
-            for persona_name, scores in llm_persona_scores.items():
-                if scores:
-                    avg_score = sum(scores) / len(scores)
-                    bar = "#" * int(avg_score * 2) + " " * (20 - int(avg_score * 2))
-                    f.write(f"{persona_name:14} [{bar}] {avg_score:.1f}/10\n")
-        else:
-            f.write("No LLM ratings found.\n")
+    for run_dir in run_dirs:
+        run_info = load_run_info(run_dir)
+        # new results are appended, a line cut off by the crash goes first
+        completed_results = load_checkpoint(run_dir, repair=True)
+
+        print_header(f"RESUMING RUN: {run_dir}")
+
+        run_pipeline_for_model(
+            run_info["model_key"],
+            run_info["model_config"],
+            run_info["dilemmas"],
+            output_dir=run_dir,
+            completed_results=completed_results,
+            plot_mode=plot_mode,
+            report=report,
+        )
 
-        f.write("\nWINNER DISTRIBUTION:\n")
-        f.write("-" * 40 + "\n")
+        print(f"\n✓ Completed {run_info['model_key']}, results saved to: {run_dir}")
 
-        win_counts = {}
-        fallback_count = 0
-        for result in results:
-            winner, was_fallback = extract_winner(
-                result.get("judge_verdict", ""), result.get("llm_ratings", {})
-            )
-            win_counts[winner] = win_counts.get(winner, 0) + 1
-            if was_fallback:
-                fallback_count += 1
-
-        for persona, wins in sorted(
-            win_counts.items(), key=lambda x: x[1], reverse=True
-        ):
-            bar = "#" * wins + " " * (20 - min(wins, 20))
-            f.write(f"{persona:14} [{bar[:20]}] {wins}\n")
-
-        if fallback_count > 0:
-            f.write(
-                f"\nFallback used for {fallback_count} cases - winner extracted from highest rating there\n"
-            )
+    wait_for_plots()
+    shutdown_render_pool()
 
-        # =====================================================================
-        # SENTIMENT ANALYSIS SECTION
-        # =====================================================================
-        f.write("\nSENTIMENT ANALYSIS (TextBlob):\n")
-        f.write("-" * 40 + "\n")
-
-        persona_polarity = {}
-        persona_subjectivity = {}
-        for result in results:
-            for persona_name, opinion in result["opinions"].items():
-                sentiment = analyze_sentiment(opinion)
-                if persona_name not in persona_polarity:
-                    persona_polarity[persona_name] = []
-                    persona_subjectivity[persona_name] = []
-                persona_polarity[persona_name].append(sentiment["polarity"])
-                persona_subjectivity[persona_name].append(sentiment["subjectivity"])
-
-        f.write("\nAverage polarity (-1=negative, +1=positive):\n")
-        for persona_name in persona_polarity.keys():
-            avg_polarity = sum(persona_polarity[persona_name]) / len(
-                persona_polarity[persona_name]
-            )
-            bar_pos = int((avg_polarity + 1) * 10)
-            bar = " " * bar_pos + "|" + " " * (20 - bar_pos)
-            f.write(f"{persona_name:14} [{bar}] {avg_polarity:+.2f}\n")
-
-        f.write("\nAverage subjectivity (0=objective, 1=subjective):\n")
-        for persona_name in persona_subjectivity.keys():
-            avg_subjectivity = sum(persona_subjectivity[persona_name]) / len(
-                persona_subjectivity[persona_name]
-            )
-            bar = "#" * int(avg_subjectivity * 20) + " " * (
-                20 - int(avg_subjectivity * 20)
-            )
-            f.write(f"{persona_name:14} [{bar}] {avg_subjectivity:.2f}\n")
+    print(f"\nCompleted at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-        f.write("\n" + "=" * 60 + "\n")
 
-    print(f"\nResults saved to: {filename}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Persona Dialectics pipeline")
+    parser.add_argument(
+        "--resume",
+        nargs="+",
+        metavar="RUN_DIR",
+        help="continue interrupted run folder(s) from their checkpoint instead of starting a new run",
+    )
+    parser.add_argument(
+        "--plots",
+        choices=["parallel", "serial", "later", "off"],
+        default=PLOT_MODE,
+        help="how charts are produced: in worker processes, in-process, saved for 'python visualization.py RUN_DIR', or not at all",
+    )
+    parser.add_argument(
+        "--no-plots",
+        dest="plots",
+        action="store_const",
+        const="off",
+        help="same as --plots off",
+    )
+    parser.add_argument(
+        "--parallel-models",
+        action="store_true",
+        default=PARALLEL_MODELS,
+        help="run all active models at once, one process per model (devices from MODEL_DEVICES)",
+    )
+    parser.add_argument(
+        "--no-report",
+        dest="report",
+        action="store_false",
+        help="only generate and checkpoint, build summaries/charts/report.txt later with report.py",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="show the models, devices, generation profiles and dilemmas of a run without loading any model",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=INSTRUMENTATION,
+        help="record load/tokenize/prefill/decode/analysis/chart timings and token counts per role, printed per model and saved to metrics.json",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    args = parse_args()
+    instrumentation.enable(args.profile)
+
+    if args.resume:
+        resume_runs(args.resume, plot_mode=args.plots, report=args.report)
+    else:
+        run_pipeline(
+            plot_mode=args.plots,
+            report=args.report,
+            parallel=args.parallel_models,
+            dry_run=args.dry_run,
+        )
@@ -1,11 +1,180 @@
+import copy
 import gc
+import os
+import time
+from collections import OrderedDict
+from threading import Thread
+
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from config import MODEL_CACHE_DIR, MAX_NEW_TOKENS, TEMPERATURE, DO_SAMPLE
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    DynamicCache,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+    set_seed,
+)
+from config import (
+    MODEL_CACHE_DIR,
+    MODEL_DEVICE,
+    CPU_DTYPE,
+    CPU_QUANTIZE_INT8,
+    CPU_NUM_THREADS,
+    CPU_NUM_INTEROP_THREADS,
+    GENERATION_BATCH_SIZE,
+    USE_PREFIX_CACHE,
+    PREFIX_CACHE_MAX_MB,
+    GENERATION_SEED,
+)
+import instrumentation
+from generation_cache import get_generation_cache, make_cache_key
+from profiles import (
+    get_generation_profile,
+    is_cacheable,
+    record_role_cost,
+    role_stats,
+    trim_response,
+)
+from stopping import BudgetStoppingCriteria
+
+# placeholder used to find where the user message starts in a chat template
+_USER_PLACEHOLDER = "<<USER_MESSAGE_PLACEHOLDER>>"
+
+
+class PrefixCache:
+    """
+    LRU store of past-key-values for fixed chat-template prefixes.
+
+    System prompts (personas, synthesizer, judge) are the same for every
+    dilemma, so their KV cache is computed once and only the dilemma-specific
+    suffix has to be prefilled on later calls.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # prefix ids -> (DynamicCache, nbytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, cache, nbytes):
+        if nbytes > self.max_bytes:
+            # would evict everything else and still not fit
+            return
+
+        self.entries[key] = (cache, nbytes)
+        self.total_bytes += nbytes
+
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_bytes
+            self.evictions += 1
+
+    def clear(self):
+        # stats are per model, unload_model clears the cache between models
+        self.entries.clear()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "memory_mb": self.total_bytes / (1024 * 1024),
+        }
+
+
+prefix_cache = PrefixCache(PREFIX_CACHE_MAX_MB * 1024 * 1024)
+
+
+def parse_device(device):
+    """
+    Splits a device spec like "cuda:1" or "cpu:0-3,8" into the torch device
+    and the set of CPU cores to pin to (None = no pinning).
+    """
+    if not device.startswith("cpu"):
+        return device, None
+
+    _, _, core_spec = device.partition(":")
+    if not core_spec:
+        return "cpu", None
+
+    cores = set()
+    for part in core_spec.split(","):
+        first, _, last = part.partition("-")
+        cores.update(range(int(first), int(last or first) + 1))
+    return "cpu", cores
 
 
-def load_model(model_id: str):
-    print(f"Loading model: {model_id}")
+def pin_process(device):
+    """
+    Restricts this process (and torch's CPU threads) to the cores of a
+    "cpu:..." device spec. Returns the cores, or None if nothing was pinned.
+    """
+    _, cores = parse_device(device)
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return None
+
+    os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    return cores
+
+
+def configure_cpu_threads(num_threads=CPU_NUM_THREADS, interop=CPU_NUM_INTEROP_THREADS):
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    if interop:
+        try:
+            torch.set_num_interop_threads(interop)
+        except RuntimeError:
+            # can only be set once, before any inter-op parallel work started
+            print("Warning: inter-op threads already fixed, keeping the current value")
+
+
+def quantize_int8(model):
+    """
+    Dynamic int8 quantization of every nn.Linear (CPU only, float32 model).
+    """
+    model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    model.quantized_int8 = True  # part of the generation cache key
+    return model
+
+
+def load_model(
+    model_id: str,
+    device: str = MODEL_DEVICE,
+    cpu_dtype: str = CPU_DTYPE,
+    quantize: bool = CPU_QUANTIZE_INT8,
+):
+    with instrumentation.span("load_model_s", model=model_id):
+        return _load_model(model_id, device, cpu_dtype, quantize)
+
+
+def _load_model(model_id, device, cpu_dtype, quantize):
+    device, _ = parse_device(device)
+
+    print(f"Loading model: {model_id} ({device})")
     print(f"Cache directory: {MODEL_CACHE_DIR}")
 
     tokenizer = AutoTokenizer.from_pretrained(
@@ -15,14 +184,28 @@ def load_model(model_id: str):
     if tokenizer.pad_token is None:
         tokenizer.pad_token = tokenizer.eos_token
 
+    if device == "cpu":
+        configure_cpu_threads()
+        # int8 quantization starts from float32 weights
+        dtype = torch.float32 if quantize else getattr(torch, cpu_dtype)
+    else:
+        dtype = torch.float16  # using half precision for less VRAM
+
     model = AutoModelForCausalLM.from_pretrained(
         model_id,
         cache_dir=MODEL_CACHE_DIR,
-        torch_dtype=torch.float16,  # using half precision for less VRAM
-        device_map="cuda",
+        torch_dtype=dtype,
+        device_map=device,
         trust_remote_code=True,
     )
 
+    if device == "cpu" and quantize:
+        model = quantize_int8(model)
+        print("Applied dynamic int8 quantization to linear layers")
+
+    if GENERATION_SEED is not None:
+        set_seed(GENERATION_SEED)
+
     print("Model loaded successfully!")
     return model, tokenizer
 
@@ -32,6 +215,10 @@ def unload_model(model, tokenizer):
     del model
     del tokenizer
 
+    # cached KV tensors belong to the unloaded model
+    prefix_cache.clear()
+    role_stats.clear()
+
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
         torch.cuda.synchronize()
@@ -41,31 +228,554 @@ def unload_model(model, tokenizer):
     print("GPU memory cleared.")
 
 
-def generate_response(model, tokenizer, system_prompt, user_message):
+def build_prompt(tokenizer, system_prompt, user_message):
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_message},
     ]
 
     # converting to model's expected format
-    prompt = tokenizer.apply_chat_template(
-        messages, tokenize=False, add_generation_prompt=True
+    with instrumentation.span("chat_template_s"):
+        return tokenizer.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
+        )
+
+
+def _kv_bytes_per_token(model):
+    cfg = model.config
+    num_heads = cfg.num_attention_heads
+    num_kv_heads = getattr(cfg, "num_key_value_heads", None) or num_heads
+    head_dim = getattr(cfg, "head_dim", None) or cfg.hidden_size // num_heads
+    # dtype.itemsize needs torch 2.1, requirements allow 2.0
+    element_size = torch.empty((), dtype=model.dtype).element_size()
+    # keys + values for every layer
+    return 2 * cfg.num_hidden_layers * num_kv_heads * head_dim * element_size
+
+
+def _prefix_ids(tokenizer, system_prompt, input_ids):
+    """
+    Token ids of the system-prompt part of input_ids (a list of ids), or
+    None when the prompt can't be split cleanly.
+    """
+    placeholder_prompt = build_prompt(tokenizer, system_prompt, _USER_PLACEHOLDER)
+    prefix_text = placeholder_prompt.split(_USER_PLACEHOLDER)[0]
+    prefix_ids = tokenizer(prefix_text)["input_ids"]
+
+    # the last token may merge with the start of the user message, so leave
+    # it (and everything after it) to the normal prefill
+    prefix_ids = prefix_ids[:-1]
+
+    if not prefix_ids or input_ids[: len(prefix_ids)] != prefix_ids:
+        return None
+    return prefix_ids
+
+
+def _cached_prefix_kv(model, prefix_ids):
+    # shared entry of the prefix cache, callers must not modify it
+    key = (model.name_or_path, tuple(prefix_ids))
+    cache = prefix_cache.get(key)
+
+    if cache is None:
+        cache = DynamicCache()
+        with torch.no_grad():
+            model(
+                input_ids=torch.tensor([prefix_ids], device=model.device),
+                past_key_values=cache,
+            )
+        prefix_cache.put(key, cache, len(prefix_ids) * _kv_bytes_per_token(model))
+
+    return cache
+
+
+def _get_prefix_kv(model, tokenizer, system_prompt, input_ids):
+    """
+    Returns (prefix_len, cache) for the system-prompt part of input_ids,
+    or (0, None) when the prompt can't be split cleanly.
+    """
+    prefix_ids = _prefix_ids(tokenizer, system_prompt, input_ids[0].tolist())
+    if prefix_ids is None:
+        return 0, None
+
+    # generate() appends to the cache in place, so hand it a copy
+    cache = _cached_prefix_kv(model, prefix_ids)
+    return len(prefix_ids), copy.deepcopy(cache)
+
+
+def _layer_kv(cache):
+    # (keys, values) per layer, DynamicCache changed its layout in 4.54
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    return list(zip(cache.key_cache, cache.value_cache))
+
+
+def _prepare_prefixed_batch(model, tokenizer, prompts, texts):
+    """
+    input_ids / attention_mask / past_key_values for a batch whose system
+    prompts come from the prefix cache, or None if a prompt can't be split.
+
+    Every row is laid out as [pad][prefix][pad][suffix]: the cached
+    prefixes end at the same column, the dilemma-specific suffixes end at
+    the last column and only those get prefilled. Padding is masked out and
+    generate() takes the positions from the mask, so each row sees the same
+    positions it would see on its own.
+    """
+    with instrumentation.span("tokenize_s"):
+        rows = tokenizer(texts)["input_ids"]
+
+    prefixes = {}
+    split_rows = []
+    for (system_prompt, _), ids in zip(prompts, rows):
+        if system_prompt not in prefixes:
+            prefixes[system_prompt] = _prefix_ids(tokenizer, system_prompt, ids)
+        prefix_ids = prefixes[system_prompt]
+        if prefix_ids is None or ids[: len(prefix_ids)] != prefix_ids:
+            return None
+        split_rows.append((prefix_ids, ids[len(prefix_ids) :]))
+
+    prefix_len = max(len(prefix_ids) for prefix_ids, _ in split_rows)
+    suffix_len = max(len(suffix) for _, suffix in split_rows)
+    pad = tokenizer.pad_token_id
+
+    input_ids, attention_mask, layers = [], [], []
+    for prefix_ids, suffix in split_rows:
+        prefix_pad = prefix_len - len(prefix_ids)
+        suffix_pad = suffix_len - len(suffix)
+        input_ids.append([pad] * prefix_pad + prefix_ids + [pad] * suffix_pad + suffix)
+        attention_mask.append(
+            [0] * prefix_pad
+            + [1] * len(prefix_ids)
+            + [0] * suffix_pad
+            + [1] * len(suffix)
+        )
+
+        row_layers = []
+        for keys, values in _layer_kv(_cached_prefix_kv(model, prefix_ids)):
+            # masked filler in front of shorter prefixes
+            filler = keys.new_zeros(*keys.shape[:2], prefix_pad, keys.shape[3])
+            row_layers.append(
+                (torch.cat([filler, keys], dim=2), torch.cat([filler, values], dim=2))
+            )
+        layers.append(row_layers)
+
+    # one batch-sized copy, generate() appends to it in place
+    past_key_values = DynamicCache()
+    for layer_idx, row_kvs in enumerate(zip(*layers)):
+        past_key_values.update(
+            torch.cat([keys for keys, _ in row_kvs]),
+            torch.cat([values for _, values in row_kvs]),
+            layer_idx,
+        )
+
+    return {
+        "input_ids": torch.tensor(input_ids, device=model.device),
+        "attention_mask": torch.tensor(attention_mask, device=model.device),
+        "past_key_values": past_key_values,
+    }
+
+
+def _sampling_kwargs(profile):
+    return {"temperature": profile["temperature"], "do_sample": profile["do_sample"]}
+
+
+def _stopping_criteria(tokenizer, prompt_len, profiles):
+    # a single shared max_new_tokens is handled by generate() itself
+    early_stop = any(
+        profile.get("max_sentences") or profile.get("stop_strings")
+        for profile in profiles
+    )
+    if not early_stop and len({p["max_new_tokens"] for p in profiles}) == 1:
+        return None
+
+    return StoppingCriteriaList(
+        [BudgetStoppingCriteria(tokenizer, prompt_len, profiles)]
     )
 
-    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
 
+def _generation_cache_key(model, system_prompt, user_message, profile):
+    sampling_params = {
+        **profile,
+        # fp16 / fp32 / bf16 / int8 weights don't give identical responses
+        "weights": str(model.dtype)
+        + ("+int8" if getattr(model, "quantized_int8", False) else ""),
+    }
+    return make_cache_key(
+        model.name_or_path,
+        system_prompt,
+        user_message,
+        sampling_params,
+        GENERATION_SEED,
+    )
+
+
+def decode_new_tokens(tokenizer, output_ids, prompt_len):
+    """
+    Decodes only what generate() added after the prompt, one string per row.
+
+    generate() returns prompt + completion. With left padding every row's
+    prompt (padding included) is prompt_len tokens long, so the completion
+    always starts at the same column; the prompt is never decoded.
+    """
+    with instrumentation.span("detokenize_s"):
+        texts = tokenizer.batch_decode(
+            output_ids[:, prompt_len:], skip_special_tokens=True
+        )
+    return [text.strip() for text in texts]
+
+
+class _FirstTokenTimer(StoppingCriteria):
+    # stopping criteria run once per generated token, the first call marks
+    # the end of the prefill; never stops anything
+    def __init__(self):
+        self.first_token_at = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        return torch.zeros(
+            input_ids.shape[0], dtype=torch.bool, device=input_ids.device
+        )
+
+
+def _generate(model, tokenizer, roles, generate_kwargs):
+    """
+    model.generate with prefill/decode timings and token counts recorded
+    per model and role when instrumentation is on.
+    """
+    if not instrumentation.enabled:
+        with torch.no_grad():
+            return model.generate(**generate_kwargs)
+
+    timer = _FirstTokenTimer()
+    criteria = StoppingCriteriaList(generate_kwargs.get("stopping_criteria") or [])
+    criteria.append(timer)
+
+    start = time.perf_counter()
     with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=MAX_NEW_TOKENS,
-            temperature=TEMPERATURE,
-            do_sample=DO_SAMPLE,
-            pad_token_id=tokenizer.pad_token_id,
+        outputs = model.generate(**dict(generate_kwargs, stopping_criteria=criteria))
+    end = time.perf_counter()
+
+    model_label = model.name_or_path or type(model).__name__
+    prompt_len = generate_kwargs["input_ids"].shape[1]
+    prompt_tokens = generate_kwargs["attention_mask"].sum(dim=1).tolist()
+    new_tokens = (outputs[:, prompt_len:] != tokenizer.pad_token_id).sum(dim=1).tolist()
+    # the first token of every row comes out of the prefill
+    decode_tokens = [max(0, count - 1) for count in new_tokens]
+
+    # a batch can mix roles: its prefill time is split across the rows by
+    # prompt tokens and its decode time by decode tokens, like record_role_cost
+    first_token_at = timer.first_token_at or end
+    prefill_s, decode_s = first_token_at - start, end - first_token_at
+    prefill_weights = prompt_tokens if sum(prompt_tokens) else [1] * len(roles)
+    decode_weights = decode_tokens if sum(decode_tokens) else [1] * len(roles)
+    prefill_total, decode_total = sum(prefill_weights), sum(decode_weights)
+
+    per_role = {}
+    for i, role in enumerate(roles):
+        labels = {"model": model_label, "role": role or "default"}
+        instrumentation.count("calls", **labels)
+        instrumentation.count("prompt_tokens", prompt_tokens[i], **labels)
+        instrumentation.count("generated_tokens", new_tokens[i], **labels)
+
+        shares = per_role.setdefault(role or "default", [0.0, 0.0, 0])
+        shares[0] += prefill_s * prefill_weights[i] / prefill_total
+        shares[1] += decode_s * decode_weights[i] / decode_total
+        shares[2] += decode_tokens[i]
+
+    for role, (role_prefill_s, role_decode_s, role_decode_tokens) in per_role.items():
+        labels = {"model": model_label, "role": role}
+        instrumentation.observe("generate_s", role_prefill_s + role_decode_s, **labels)
+        instrumentation.observe("prefill_s", role_prefill_s, **labels)
+        instrumentation.observe("decode_s", role_decode_s, **labels)
+        instrumentation.count("decode_tokens", role_decode_tokens, **labels)
+        # size of the whole batch the role's rows ran in
+        instrumentation.observe("batch_size", len(roles), **labels)
+
+    return outputs
+
+
+def _prepare_single(model, tokenizer, system_prompt, user_message, profile):
+    # generate() kwargs for one prompt, with the prefix KV cache if possible
+    prompt = build_prompt(tokenizer, system_prompt, user_message)
+
+    with instrumentation.span("tokenize_s"):
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+
+    generate_kwargs = dict(inputs)
+    if USE_PREFIX_CACHE:
+        _, past_key_values = _get_prefix_kv(
+            model, tokenizer, system_prompt, inputs["input_ids"]
         )
+        if past_key_values is not None:
+            generate_kwargs["past_key_values"] = past_key_values
+
+    generate_kwargs.update(
+        max_new_tokens=profile["max_new_tokens"],
+        **_sampling_kwargs(profile),
+        pad_token_id=tokenizer.pad_token_id,
+        stopping_criteria=_stopping_criteria(
+            tokenizer, inputs["input_ids"].shape[1], [profile]
+        ),
+    )
+    return generate_kwargs
 
-    full_response = tokenizer.decode(outputs[0], skip_special_tokens=True)
 
-    # extracting only the response
-    response = full_response.split("assistant")[-1].strip()
+def generate_response(model, tokenizer, system_prompt, user_message, role=None):
+    profile = get_generation_profile(role)
+
+    if is_cacheable(profile):
+        cache_key = _generation_cache_key(model, system_prompt, user_message, profile)
+        cached = get_generation_cache().get(cache_key)
+        if cached is not None:
+            record_role_cost(role, cached=True)
+            return cached
+
+    generate_kwargs = _prepare_single(
+        model, tokenizer, system_prompt, user_message, profile
+    )
+
+    start_time = time.perf_counter()
+    outputs = _generate(model, tokenizer, [role], generate_kwargs)
+
+    prompt_len = generate_kwargs["input_ids"].shape[1]
+    record_role_cost(
+        role,
+        new_tokens=outputs.shape[1] - prompt_len,
+        seconds=time.perf_counter() - start_time,
+    )
+
+    response = decode_new_tokens(tokenizer, outputs, prompt_len)[0]
+    response = trim_response(response, profile)
+
+    if is_cacheable(profile):
+        get_generation_cache().put(cache_key, response)
 
     return response
+
+
+def stream_response(model, tokenizer, system_prompt, user_message, role=None):
+    """
+    Same as generate_response, but yields the response text piece by piece
+    while it's being generated.
+
+    The role's budget stops generation right after the token that completes
+    the last allowed sentence or a stop string, so the streamed text can
+    overshoot by that one token; the joined text is trimmed to the same
+    response generate_response returns before it's cached.
+    """
+    profile = get_generation_profile(role)
+
+    if is_cacheable(profile):
+        cache_key = _generation_cache_key(model, system_prompt, user_message, profile)
+        cached = get_generation_cache().get(cache_key)
+        if cached is not None:
+            record_role_cost(role, cached=True)
+            yield cached
+            return
+
+    generate_kwargs = _prepare_single(
+        model, tokenizer, system_prompt, user_message, profile
+    )
+    streamer = TextIteratorStreamer(
+        tokenizer, skip_prompt=True, skip_special_tokens=True
+    )
+
+    errors = []
+
+    def run_generate():
+        try:
+            _generate(
+                model, tokenizer, [role], dict(generate_kwargs, streamer=streamer)
+            )
+        except Exception as e:
+            # the streamer only stops on end(), without it the loop below
+            # would wait forever
+            errors.append(e)
+            streamer.end()
+
+    start_time = time.perf_counter()
+    thread = Thread(target=run_generate, daemon=True)
+    thread.start()
+
+    pieces = []
+    for piece in streamer:
+        pieces.append(piece)
+        yield piece
+    thread.join()
+
+    if errors:
+        raise errors[0]
+
+    response = "".join(pieces)
+    record_role_cost(
+        role,
+        new_tokens=len(tokenizer(response, add_special_tokens=False)["input_ids"]),
+        seconds=time.perf_counter() - start_time,
+    )
+
+    if is_cacheable(profile):
+        get_generation_cache().put(cache_key, trim_response(response, profile))
+
+
+def generate_batch(
+    model, tokenizer, prompts, batch_size=GENERATION_BATCH_SIZE, roles=None
+):
+    """
+    Generates responses for many (system_prompt, user_message) pairs at once.
+
+    Prompts are left-padded so that every sequence ends right where generation
+    starts, which lets the whole batch share one model.generate call.
+    With USE_PREFIX_CACHE the system prompts' KV comes from the prefix cache
+    and only the dilemma-specific part of each prompt is prefilled.
+    With greedy decoding each output matches what generate_response returns
+    for the same prompt.
+
+    roles can be one role for the whole batch or one per prompt, every row
+    stops on its own role's budget.
+
+    Returns:
+        list: responses in the same order as prompts
+    """
+    if not prompts:
+        return []
+
+    if roles is None or isinstance(roles, str):
+        roles = [roles] * len(prompts)
+    profiles = [get_generation_profile(role) for role in roles]
+
+    cacheable = [i for i, profile in enumerate(profiles) if is_cacheable(profile)]
+    if not cacheable:
+        return _generate_batch_uncached(
+            model, tokenizer, prompts, batch_size, profiles, roles
+        )
+
+    # only prompts that were never generated before go to the model
+    cache = get_generation_cache()
+    keys = {
+        i: _generation_cache_key(model, *prompts[i], profiles[i]) for i in cacheable
+    }
+    cached = cache.get_many(list(keys.values()))
+
+    responses = [None] * len(prompts)
+    for i, key in keys.items():
+        if key in cached:
+            responses[i] = cached[key]
+            record_role_cost(roles[i], cached=True)
+
+    missing = [i for i in range(len(prompts)) if i not in keys or keys[i] not in cached]
+    if missing:
+        new_responses = _generate_batch_uncached(
+            model,
+            tokenizer,
+            [prompts[i] for i in missing],
+            batch_size,
+            [profiles[i] for i in missing],
+            [roles[i] for i in missing],
+        )
+        for i, response in zip(missing, new_responses):
+            responses[i] = response
+        cache.put_many([(keys[i], responses[i]) for i in missing if i in keys])
+
+    return responses
+
+
+def _generate_batch_uncached(model, tokenizer, prompts, batch_size, profiles, roles):
+    # rows of one generate() call have to share the sampling settings
+    groups = {}
+    for i, profile in enumerate(profiles):
+        sampling = tuple(_sampling_kwargs(profile).items())
+        groups.setdefault(sampling, []).append(i)
+
+    responses = [None] * len(prompts)
+    for indices in groups.values():
+        group_responses = _generate_group(
+            model,
+            tokenizer,
+            [prompts[i] for i in indices],
+            batch_size,
+            [profiles[i] for i in indices],
+            [roles[i] for i in indices],
+        )
+        for i, response in zip(indices, group_responses):
+            responses[i] = response
+
+    return responses
+
+
+def _generate_group(model, tokenizer, prompts, batch_size, profiles, roles):
+    if not batch_size:
+        batch_size = len(prompts)
+
+    texts = [build_prompt(tokenizer, system, user) for system, user in prompts]
+    responses = []
+
+    # decoder-only models have to be padded on the left for batched generation
+    original_padding_side = tokenizer.padding_side
+    tokenizer.padding_side = "left"
+
+    try:
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start : start + batch_size]
+            chunk_profiles = profiles[start : start + batch_size]
+            chunk_roles = roles[start : start + batch_size]
+
+            inputs = None
+            if USE_PREFIX_CACHE:
+                inputs = _prepare_prefixed_batch(
+                    model, tokenizer, prompts[start : start + batch_size], chunk
+                )
+            if inputs is None:
+                with instrumentation.span("tokenize_s"):
+                    inputs = tokenizer(chunk, return_tensors="pt", padding=True).to(
+                        model.device
+                    )
+            prompt_len = inputs["input_ids"].shape[1]
+
+            start_time = time.perf_counter()
+            outputs = _generate(
+                model,
+                tokenizer,
+                chunk_roles,
+                dict(
+                    inputs,
+                    # rows with a smaller budget are stopped by the criteria
+                    max_new_tokens=max(p["max_new_tokens"] for p in chunk_profiles),
+                    **_sampling_kwargs(chunk_profiles[0]),
+                    pad_token_id=tokenizer.pad_token_id,
+                    stopping_criteria=_stopping_criteria(
+                        tokenizer, prompt_len, chunk_profiles
+                    ),
+                ),
+            )
+            elapsed = time.perf_counter() - start_time
+
+            new_tokens = outputs[:, prompt_len:]
+            token_counts = (new_tokens != tokenizer.pad_token_id).sum(dim=1).tolist()
+            total_tokens = sum(token_counts) or 1
+
+            chunk_responses = decode_new_tokens(tokenizer, outputs, prompt_len)
+            for response, count, profile, role in zip(
+                chunk_responses, token_counts, chunk_profiles, chunk_roles
+            ):
+                responses.append(trim_response(response, profile))
+                # the batch's time is split by each row's share of the tokens
+                record_role_cost(
+                    role, new_tokens=count, seconds=elapsed * count / total_tokens
+                )
+    finally:
+        tokenizer.padding_side = original_padding_side
+
+    return responses
+
+
+def print_prefix_cache_stats():
+    stats = prefix_cache.stats()
+    print("\nPrefix KV cache:")
+    print("-" * 40)
+    print(
+        f"  hits: {stats['hits']}, misses: {stats['misses']} "
+        f"({stats['hit_rate']:.0%} hit rate)"
+    )
+    print(
+        f"  entries: {stats['entries']}, memory: {stats['memory_mb']:.1f} MB, "
+        f"evictions: {stats['evictions']}"
+    )
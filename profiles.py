@@ -0,0 +1,96 @@
+import re
+
+from config import (
+    MAX_NEW_TOKENS,
+    TEMPERATURE,
+    DO_SAMPLE,
+    GENERATION_PROFILES,
+    USE_GENERATION_CACHE,
+    GENERATION_SEED,
+)
+
+# role budgets and per-role cost, shared by every backend. no torch or
+# transformers in here, the openai backend runs without them
+
+
+def get_generation_profile(role=None):
+    """
+    Generation settings for a role ("persona", "synthesizer", "judge"),
+    None = the global MAX_NEW_TOKENS / TEMPERATURE / DO_SAMPLE without
+    early stopping.
+    """
+    profile = {
+        "max_new_tokens": MAX_NEW_TOKENS,
+        "temperature": TEMPERATURE,
+        "do_sample": DO_SAMPLE,
+    }
+    if role is not None:
+        profile.update(GENERATION_PROFILES[role])
+    return profile
+
+
+def is_cacheable(profile):
+    # unseeded sampling is meant to give new responses on every run, a cache
+    # hit would replay the first run instead
+    return USE_GENERATION_CACHE and (
+        not profile["do_sample"] or GENERATION_SEED is not None
+    )
+
+
+# a sentence ends at . ! or ? (plus closing quotes/brackets) followed by
+# whitespace or the end of the text so far
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s|$)")
+
+
+def count_sentences(text):
+    return len(_SENTENCE_END.findall(text))
+
+
+def trim_response(text, profile):
+    """
+    Cuts a response back to its role's budget: everything from the first
+    stop string on, and everything after the last allowed sentence.
+    """
+    for stop in profile.get("stop_strings") or ():
+        index = text.find(stop)
+        if index != -1:
+            text = text[:index]
+
+    max_sentences = profile.get("max_sentences")
+    if max_sentences:
+        ends = list(_SENTENCE_END.finditer(text))
+        if len(ends) > max_sentences:
+            text = text[: ends[max_sentences - 1].end()]
+
+    return text.strip()
+
+
+# generation cost per role for the current model, see print_role_stats
+role_stats = {}
+
+
+def record_role_cost(role, new_tokens=0, seconds=0.0, cached=False):
+    stats = role_stats.setdefault(
+        role or "default",
+        {"calls": 0, "cached": 0, "new_tokens": 0, "seconds": 0.0},
+    )
+    stats["calls"] += 1
+    stats["cached"] += int(cached)
+    stats["new_tokens"] += new_tokens
+    stats["seconds"] += seconds
+
+
+def print_role_stats():
+    print("\nGeneration cost per role:")
+    print("-" * 40)
+    total_seconds = sum(stats["seconds"] for stats in role_stats.values()) or 1.0
+
+    for role, stats in role_stats.items():
+        generated = stats["calls"] - stats["cached"]
+        avg_tokens = stats["new_tokens"] / generated if generated else 0
+        tokens_per_s = stats["new_tokens"] / stats["seconds"] if stats["seconds"] else 0
+        print(
+            f"  {role:12} {stats['calls']:5} calls ({stats['cached']} cached), "
+            f"{avg_tokens:5.1f} tokens/call, {stats['seconds']:7.1f}s "
+            f"({stats['seconds'] / total_seconds:.0%}), {tokens_per_s:.1f} tokens/s"
+        )
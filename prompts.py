@@ -0,0 +1,38 @@
+from config import PERSONAS
+
+
+def build_persona_prompt(dilemma):
+    return f"Dilemma: {dilemma['description']}\n\nGive your verdict in 1-2 sentences. Be direct."
+
+
+def build_synthesizer_prompt(dilemma, opinions):
+    # building prompt with all perssona opinions
+    synth_opinions_text = "\n\n".join(
+        [f"{name}: {opinions[name]}" for name in PERSONAS.keys()]
+    )
+
+    return f"""Dilemma: {dilemma["description"]}
+
+Here are the perspectives from different personas:
+
+{synth_opinions_text}
+
+Create a HYBRID solution that combines the best elements. Be decisive."""
+
+
+def build_judge_prompt(dilemma, opinions, synth_response):
+    # build the judge's prompt with all opinions dynamically
+    # Synthesizer isnt in opinions dict yet, so it won't be listed as a candidate
+    opinions_text = "\n\n".join(
+        [f"{name.upper()}: {opinions[name]}" for name in opinions.keys()]
+    )
+
+    return f"""Dilemma: {dilemma["description"]}
+
+{opinions_text}
+
+ADVISOR (SYNTHESIZER) RECOMMENDATION:
+{synth_response}
+
+Rate each persona's affiliation to their role (1-10) and declare the winner.
+REMEMBER: The Synthesizer is your advisor, NOT a contestant."""
@@ -0,0 +1,342 @@
+import argparse
+import json
+import os
+from datetime import datetime
+
+from config import PERSONAS, PLOT_MODE, RESULTS_PARQUET
+from analysis import (
+    annotate_results,
+    print_analysis_summary,
+    print_llm_affiliation_summary,
+    print_sentiment_summary,
+)
+from visualization import generate_visual_report, shutdown_render_pool, wait_for_plots
+from checkpoint import load_run_info, load_checkpoint
+
+# everything in here works from saved results only, so reports can be
+# (re)built on a machine without a GPU:
+#   python report.py results/run_3B_20260203_144258
+
+RESULTS_JSONL_FILE = "results.jsonl"
+RESULTS_PARQUET_FILE = "results.parquet"
+
+
+def write_report(
+    all_results,
+    output_dir,
+    model_key=None,
+    model_name=None,
+    plot_mode=PLOT_MODE,
+    wait_for_charts=True,
+):
+    """
+    Console summaries, charts and report.txt for one model's results.
+    """
+    print_analysis_summary(all_results)
+    print_llm_affiliation_summary(all_results)
+    print_sentiment_summary(all_results)
+
+    generate_visual_report(
+        all_results,
+        model_key=model_key,
+        output_dir=output_dir,
+        plot_mode=plot_mode,
+        wait_for_charts=wait_for_charts,
+    )
+
+    # save text results to the same folder
+    save_results(all_results, output_dir, model_name=model_name)
+    save_structured_results(all_results, output_dir)
+
+
+def iter_result_rows(all_results, run_id=None):
+    """
+    Flattens results into one row per (model, dilemma, persona), Synthesizer
+    included. Rows only hold plain JSON types.
+    """
+    # no-op for results that were already analyzed
+    annotate_results(all_results)
+
+    for result in all_results:
+        llm_ratings = result.get("llm_ratings") or {}
+
+        for persona_name, record in result["analysis"].items():
+            yield {
+                "run_id": run_id,
+                "model_key": result.get("model_key"),
+                "model_name": result.get("model_name"),
+                "dilemma_id": result["dilemma_id"],
+                "dilemma_title": result["dilemma_title"],
+                "persona": persona_name,
+                "response": result["opinions"][persona_name],
+                "judge_rating": llm_ratings.get(persona_name),
+                "is_winner": result["winner"] == persona_name,
+                "winner_fallback": result["winner_fallback"],
+                "keyword_score": record["score"],
+                "keywords_found": record["keywords_found"],
+                "forbidden_found": record["forbidden_found"],
+                "polarity": record["sentiment"]["polarity"],
+                "subjectivity": record["sentiment"]["subjectivity"],
+                "word_count": record["word_count"],
+                # whole dilemma (all personas + synthesizer + judge), missing
+                # for runs checkpointed before timings were recorded
+                "dilemma_elapsed_s": result.get("elapsed_s"),
+            }
+
+
+def save_structured_results(all_results, output_dir, parquet=RESULTS_PARQUET):
+    """
+    Writes results.jsonl (and results.parquet if enabled) next to report.txt.
+    """
+    run_id = os.path.basename(os.path.normpath(output_dir))
+
+    filepath = os.path.join(output_dir, RESULTS_JSONL_FILE)
+    with open(filepath, "w", encoding="utf-8") as f:
+        for row in iter_result_rows(all_results, run_id=run_id):
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    print(f"Structured results saved to: {filepath}")
+
+    if not parquet:
+        return
+
+    try:
+        import pandas as pd
+
+        df = pd.read_json(filepath, lines=True, dtype=False)
+        parquet_path = os.path.join(output_dir, RESULTS_PARQUET_FILE)
+        df.to_parquet(parquet_path, index=False)
+        print(f"Parquet roll-up saved to: {parquet_path}")
+    except ImportError as e:
+        print(f"Warning: skipping {RESULTS_PARQUET_FILE} ({e})")
+
+
+def read_result_rows(path):
+    """
+    Streams the rows of a results.jsonl file (or of a run folder) one at a
+    time, so many runs can be aggregated without loading them all.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, RESULTS_JSONL_FILE)
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_run_results(run_dir):
+    """
+    Returns (run_info, results) of a run folder, results in dilemma order
+    and analyzed.
+    """
+    run_info = load_run_info(run_dir)
+    results = load_checkpoint(run_dir)
+
+    # checkpoints are written in completion order
+    dilemma_order = {dilemma["id"]: i for i, dilemma in enumerate(run_info["dilemmas"])}
+    results.sort(key=lambda result: dilemma_order.get(result["dilemma_id"], 0))
+
+    annotate_results(results)
+    return run_info, results
+
+
+def build_report(run_dir, plot_mode=PLOT_MODE):
+    """
+    Rebuilds every chart and report.txt of a run folder from its checkpoint.
+    """
+    run_info, results = load_run_results(run_dir)
+    model_key = run_info["model_key"]
+    model_name = run_info["model_config"]["name"]
+
+    if not results:
+        print(f"Warning: no results saved in {run_dir}, nothing to report")
+        return run_info, results
+
+    missing = len(run_info["dilemmas"]) - len(results)
+    print(f"\nReport for {model_name} ({model_key}): {len(results)} dilemmas")
+    if missing > 0:
+        print(f"Warning: {missing} dilemmas not finished yet, reporting partial run")
+
+    write_report(
+        results,
+        run_dir,
+        model_key=model_key,
+        model_name=model_name,
+        plot_mode=plot_mode,
+    )
+    return run_info, results
+
+
+def save_results(results, output_dir=None, model_name=None):
+    if output_dir is None:
+        os.makedirs("results", exist_ok=True)
+        output_dir = "results"
+        filename = os.path.join(
+            output_dir, f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        )
+    else:
+        filename = os.path.join(output_dir, "report.txt")
+
+    # no-op for results that were already analyzed
+    annotate_results(results)
+
+    model_info = f"({model_name})" if model_name else ""
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("=" * 60 + "\n")
+        f.write(f"  RESULTS REPORT {model_info}\n")
+        f.write(f"  Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write("=" * 60 + "\n\n")
+
+        for result in results:
+            # full title (not truncated)
+            f.write(f"DILEMMA {result['dilemma_id']}: {result['dilemma_title']}\n")
+            f.write("-" * 40 + "\n")
+            # + full description
+            if result.get("dilemma_description"):
+                f.write(f"\n{result['dilemma_description']}\n")
+            f.write("\n")
+
+            for persona, opinion in result["opinions"].items():
+                f.write(f"{persona}:\n{opinion}\n\n")
+
+            f.write(f"JUDGE'S VERDICT:\n{result['judge_verdict']}\n\n")
+
+            if result.get("llm_ratings"):
+                f.write("LLM AFFILIATION RATINGS:\n")
+                for persona, rating in result["llm_ratings"].items():
+                    f.write(f"  - {persona}: {rating}/10\n")
+                f.write("\n")
+
+            f.write("=" * 60 + "\n\n")
+
+        # =====================================================================
+        # SUMMARY SECTION
+        # =====================================================================
+        f.write("\n")
+        f.write("=" * 60 + "\n")
+        f.write("  FINAL SUMMARY\n")
+        f.write("=" * 60 + "\n\n")
+
+        f.write(f"Total dilemmas processed: {len(results)}\n")
+        f.write(f"Personas used: {', '.join(PERSONAS.keys())}, Synthesizer\n\n")
+
+        f.write("CONTROLLABILITY ANALYSIS (Keyword-based):\n")
+        f.write("-" * 40 + "\n")
+        persona_scores = {}
+        for result in results:
+            for persona_name, record in result["analysis"].items():
+                if persona_name not in persona_scores:
+                    persona_scores[persona_name] = []
+                persona_scores[persona_name].append(record["score"])
+
+        for persona_name, scores in persona_scores.items():
+            if scores:
+                avg_score = sum(scores) / len(scores)
+                bar = "#" * int(avg_score * 20) + " " * (20 - int(avg_score * 20))
+                f.write(f"{persona_name:14} [{bar}] {avg_score:.2%}\n")
+
+        f.write("\nLLM AFFILIATION RATINGS (Judge-Rated):\n")
+        f.write("-" * 40 + "\n")
+        llm_persona_scores = {}
+        for result in results:
+            llm_ratings = result.get("llm_ratings", {})
+            for persona_name, rating in llm_ratings.items():
+                if persona_name not in llm_persona_scores:
+                    llm_persona_scores[persona_name] = []
+                llm_persona_scores[persona_name].append(rating)
+
+        if llm_persona_scores:
+            for persona_name, scores in llm_persona_scores.items():
+                if scores:
+                    avg_score = sum(scores) / len(scores)
+                    bar = "#" * int(avg_score * 2) + " " * (20 - int(avg_score * 2))
+                    f.write(f"{persona_name:14} [{bar}] {avg_score:.1f}/10\n")
+        else:
+            f.write("No LLM ratings found.\n")
+
+        f.write("\nWINNER DISTRIBUTION:\n")
+        f.write("-" * 40 + "\n")
+
+        win_counts = {}
+        fallback_count = 0
+        for result in results:
+            winner = result["winner"]
+            win_counts[winner] = win_counts.get(winner, 0) + 1
+            if result["winner_fallback"]:
+                fallback_count += 1
+
+        for persona, wins in sorted(
+            win_counts.items(), key=lambda x: x[1], reverse=True
+        ):
+            bar = "#" * wins + " " * (20 - min(wins, 20))
+            f.write(f"{persona:14} [{bar[:20]}] {wins}\n")
+
+        if fallback_count > 0:
+            f.write(
+                f"\nFallback used for {fallback_count} cases - winner extracted from highest rating there\n"
+            )
+
+        # =====================================================================
+        # SENTIMENT ANALYSIS SECTION
+        # =====================================================================
+        f.write("\nSENTIMENT ANALYSIS (TextBlob):\n")
+        f.write("-" * 40 + "\n")
+
+        persona_polarity = {}
+        persona_subjectivity = {}
+        for result in results:
+            for persona_name, record in result["analysis"].items():
+                sentiment = record["sentiment"]
+                if persona_name not in persona_polarity:
+                    persona_polarity[persona_name] = []
+                    persona_subjectivity[persona_name] = []
+                persona_polarity[persona_name].append(sentiment["polarity"])
+                persona_subjectivity[persona_name].append(sentiment["subjectivity"])
+
+        f.write("\nAverage polarity (-1=negative, +1=positive):\n")
+        for persona_name in persona_polarity.keys():
+            avg_polarity = sum(persona_polarity[persona_name]) / len(
+                persona_polarity[persona_name]
+            )
+            bar_pos = int((avg_polarity + 1) * 10)
+            bar = " " * bar_pos + "|" + " " * (20 - bar_pos)
+            f.write(f"{persona_name:14} [{bar}] {avg_polarity:+.2f}\n")
+
+        f.write("\nAverage subjectivity (0=objective, 1=subjective):\n")
+        for persona_name in persona_subjectivity.keys():
+            avg_subjectivity = sum(persona_subjectivity[persona_name]) / len(
+                persona_subjectivity[persona_name]
+            )
+            bar = "#" * int(avg_subjectivity * 20) + " " * (
+                20 - int(avg_subjectivity * 20)
+            )
+            f.write(f"{persona_name:14} [{bar}] {avg_subjectivity:.2f}\n")
+
+        f.write("\n" + "=" * 60 + "\n")
+
+    print(f"\nResults saved to: {filename}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Rebuild charts and report.txt from saved run folders"
+    )
+    parser.add_argument("run_dirs", nargs="+", metavar="RUN_DIR")
+    parser.add_argument(
+        "--plots",
+        choices=["parallel", "serial", "off"],
+        default=PLOT_MODE if PLOT_MODE != "later" else "parallel",
+        help="how charts are rendered (off = report.txt only)",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    for run_dir in args.run_dirs:
+        build_report(run_dir, plot_mode=args.plots)
+
+    wait_for_plots()
+    shutdown_render_pool()
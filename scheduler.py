@@ -0,0 +1,241 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from config import (
+    PERSONAS,
+    SYNTHESIZER_SYSTEM_PROMPT,
+    JUDGE_SYSTEM_PROMPT,
+    GENERATION_BATCH_SIZE,
+    ASYNC_CONCURRENCY,
+)
+from prompts import build_persona_prompt, build_synthesizer_prompt, build_judge_prompt
+
+# generation profile of each node, everything else is a persona
+NODE_ROLES = {"Synthesizer": "synthesizer", "Judge": "judge"}
+
+
+class DilemmaGraph:
+    """
+    Tracks one dilemma through persona -> synthesizer -> judge.
+
+    Persona requests are ready right away, the synthesizer becomes ready once
+    every persona answered, and the judge once the synthesizer did.
+    """
+
+    def __init__(self, index, dilemma):
+        self.index = index
+        self.dilemma = dilemma
+        self.opinions = {}
+        self.synth_response = None
+        self.judge_verdict = None
+        self.started_at = None
+        self.finished_at = None
+
+    def persona_requests(self):
+        self.started_at = time.perf_counter()
+        user_prompt = build_persona_prompt(self.dilemma)
+        return [
+            (self, persona_name, persona_config["system_prompt"], user_prompt)
+            for persona_name, persona_config in PERSONAS.items()
+        ]
+
+    def on_response(self, node, response):
+        """Stores a finished node and returns the requests it unlocked."""
+        if node == "Synthesizer":
+            self.synth_response = response
+            judge_prompt = build_judge_prompt(
+                self.dilemma, self.opinions, self.synth_response
+            )
+            return [(self, "Judge", JUDGE_SYSTEM_PROMPT, judge_prompt)]
+
+        if node == "Judge":
+            self.judge_verdict = response
+            self.finished_at = time.perf_counter()
+            return []
+
+        self.opinions[node] = response
+        if len(self.opinions) < len(PERSONAS):
+            return []
+
+        synth_prompt = build_synthesizer_prompt(self.dilemma, self.opinions)
+        return [(self, "Synthesizer", SYNTHESIZER_SYSTEM_PROMPT, synth_prompt)]
+
+    @property
+    def done(self):
+        return self.judge_verdict is not None
+
+    @property
+    def elapsed(self):
+        # wall time from the first persona request to the verdict, overlaps
+        # with other dilemmas sharing the same batches
+        return self.finished_at - self.started_at
+
+
+def run_scheduled(backend, dilemmas, batch_size=GENERATION_BATCH_SIZE):
+    """
+    Runs the dilemma graphs of many dilemmas through one shared batch.
+
+    Every step fills the batch first with unlocked synthesizer/judge requests
+    (so started dilemmas finish early) and tops it up with persona requests of
+    dilemmas that haven't started yet. That way the synthesizer for dilemma N
+    runs alongside the personas of dilemma N+1 instead of the device waiting
+    for each stage in turn.
+
+    Yields:
+        (dilemma, opinions, synth_response, judge_verdict, elapsed_s) as
+        dilemmas finish
+    """
+    if not batch_size:
+        batch_size = len(PERSONAS) + 2
+
+    not_started = deque(
+        DilemmaGraph(index, dilemma) for index, dilemma in enumerate(dilemmas)
+    )
+    unlocked = deque()  # synthesizer / judge requests
+    waiting = deque()  # persona requests of already admitted dilemmas
+
+    while not_started or unlocked or waiting:
+        batch = []
+        while unlocked and len(batch) < batch_size:
+            batch.append(unlocked.popleft())
+
+        while len(batch) < batch_size and (waiting or not_started):
+            if not waiting:
+                waiting.extend(not_started.popleft().persona_requests())
+            batch.append(waiting.popleft())
+
+        responses = backend.generate_batch(
+            [
+                (system_prompt, user_message)
+                for _, _, system_prompt, user_message in batch
+            ],
+            batch_size=batch_size,
+            roles=[NODE_ROLES.get(node, "persona") for _, node, _, _ in batch],
+        )
+
+        for (graph, node, _, _), response in zip(batch, responses):
+            unlocked.extend(graph.on_response(node, response))
+            if graph.done:
+                yield (
+                    graph.dilemma,
+                    graph.opinions,
+                    graph.synth_response,
+                    graph.judge_verdict,
+                    graph.elapsed,
+                )
+
+
+class PrioritySemaphore:
+    """
+    asyncio.Semaphore that hands a freed slot to the waiter with the lowest
+    priority value instead of the one that waited longest.
+    """
+
+    def __init__(self, value):
+        self._value = value
+        self._waiters = []  # heap of (priority, arrival, future)
+        self._arrivals = itertools.count()
+
+    async def acquire(self, priority):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # cancelled right after being handed the slot, pass it on.
+            # a cancelled future stays in the heap and is skipped by release
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    @asynccontextmanager
+    async def slot(self, priority):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+# later stages go first, they finish a dilemma instead of opening another
+STAGE_PRIORITY = {"Judge": 0, "Synthesizer": 1}
+PERSONA_PRIORITY = 2
+
+
+async def _request(backend, slots, graph, node, system_prompt, user_message):
+    # within a stage, the dilemma that started first goes first
+    priority = (STAGE_PRIORITY.get(node, PERSONA_PRIORITY), graph.index)
+    async with slots.slot(priority):
+        return await backend.agenerate(
+            system_prompt, user_message, role=NODE_ROLES.get(node, "persona")
+        )
+
+
+async def _run_graph(backend, graph, slots):
+    # one dilemma, every stage waits for the one before it
+    requests = graph.persona_requests()
+    while requests:
+        responses = await asyncio.gather(
+            *(
+                _request(backend, slots, graph, node, system_prompt, user_message)
+                for _, node, system_prompt, user_message in requests
+            )
+        )
+        unlocked = []
+        for (_, node, _, _), response in zip(requests, responses):
+            unlocked.extend(graph.on_response(node, response))
+        requests = unlocked
+    return graph
+
+
+async def run_async(backend, dilemmas, concurrency=ASYNC_CONCURRENCY):
+    """
+    asyncio version of run_scheduled for backends that take concurrent
+    requests (backend.agenerate).
+
+    Every dilemma starts right away, but at most concurrency requests are in
+    flight. Free slots go to judge requests first, then synthesizers, then
+    personas (earlier dilemmas first within a stage), so finished stages
+    move on instead of queueing behind the personas of every other dilemma
+    and the server is never left idle while requests are waiting.
+
+    Yields (async):
+        (dilemma, opinions, synth_response, judge_verdict, elapsed_s) as
+        dilemmas finish
+    """
+    slots = PrioritySemaphore(concurrency)
+
+    tasks = [
+        asyncio.ensure_future(_run_graph(backend, DilemmaGraph(index, dilemma), slots))
+        for index, dilemma in enumerate(dilemmas)
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            graph = await task
+            yield (
+                graph.dilemma,
+                graph.opinions,
+                graph.synth_response,
+                graph.judge_verdict,
+                graph.elapsed,
+            )
+    finally:
+        # a failed request stops the whole run, like the synchronous paths
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,57 @@
+import torch
+from transformers import StoppingCriteria
+
+from profiles import count_sentences
+
+
+class BudgetStoppingCriteria(StoppingCriteria):
+    """
+    Per-row early stop for (batched) generate calls.
+
+    Every row has its own profile (max_new_tokens, max_sentences,
+    stop_strings), so persona, synthesizer and judge prompts can share a
+    batch while each one stops on its own budget. Finished rows are padded
+    by generate() until the whole batch is done.
+    """
+
+    def __init__(self, tokenizer, prompt_len, profiles):
+        self.tokenizer = tokenizer
+        self.prompt_len = prompt_len
+        self.profiles = profiles
+        self.max_tokens = [p.get("max_new_tokens") for p in profiles]
+        self.max_sentences = [p.get("max_sentences") for p in profiles]
+        self.stop_strings = [tuple(p.get("stop_strings") or ()) for p in profiles]
+
+        # full decodes only happen after a token containing one of these
+        self.trigger_chars = set(".!?")
+        for stops in self.stop_strings:
+            self.trigger_chars.update(stop[-1] for stop in stops if stop)
+
+        self.done = [False] * len(profiles)
+
+    def _row_done(self, row, new_ids):
+        max_tokens = self.max_tokens[row]
+        if max_tokens and len(new_ids) >= max_tokens:
+            return True
+
+        if not self.max_sentences[row] and not self.stop_strings[row]:
+            return False
+
+        last_piece = self.tokenizer.decode(new_ids[-1:], skip_special_tokens=True)
+        if not self.trigger_chars.intersection(last_piece):
+            return False
+
+        text = self.tokenizer.decode(new_ids, skip_special_tokens=True)
+        if any(stop in text for stop in self.stop_strings[row]):
+            return True
+
+        max_sentences = self.max_sentences[row]
+        return bool(max_sentences) and count_sentences(text) >= max_sentences
+
+    def __call__(self, input_ids, scores, **kwargs):
+        new_tokens = input_ids[:, self.prompt_len :]
+        for row in range(len(self.done)):
+            if not self.done[row]:
+                self.done[row] = self._row_done(row, new_tokens[row])
+
+        return torch.tensor(self.done, dtype=torch.bool, device=input_ids.device)
@@ -0,0 +1,146 @@
+"""
+Minimal OpenAI-compatible server for running the pipeline offline with
+INFERENCE_BACKEND = "openai" (or a model with "backend": "openai").
+
+Answers /v1/chat/completions with made-up but deterministic text (the same
+messages always get the same reply) and lists one model on /v1/models.
+Connections are kept alive, every request is handled in its own thread.
+
+    python stub_server.py --port 8000 --latency 0.2
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from analysis import PERSONA_KEYWORDS
+from config import PERSONAS
+
+WORDS = (
+    "we should weigh the duty and the outcome for everyone involved because "
+    "honesty matters but so does compassion and the long-term consequences"
+).split()
+
+
+def stub_reply(messages, max_tokens):
+    """Deterministic reply of at most max_tokens words for a chat."""
+    seed = hashlib.sha256(
+        json.dumps(messages, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    rng = random.Random(seed)
+
+    # the judge prompt gets a verdict in the format the pipeline parses
+    if "declare the winner" in messages[-1]["content"]:
+        lines = ["RATINGS:"]
+        lines += [f"- {name}: {rng.randint(1, 10)}/10" for name in PERSONAS]
+        lines.append(f"\nWINNER: {rng.choice(list(PERSONAS))}")
+        lines.append("REASON: Their argument was the most convincing.")
+        return "\n".join(lines)
+
+    vocabulary = WORDS + [word for words in PERSONA_KEYWORDS.values() for word in words]
+    words = []
+    while len(words) < max_tokens:
+        sentence = rng.choices(vocabulary, k=rng.randint(6, 14))
+        words.extend(sentence[:-1] + [sentence[-1] + "."])
+    words[0] = words[0].capitalize()
+    return " ".join(words[:max_tokens])
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # keep-alive, like a real inference server
+    protocol_version = "HTTP/1.1"
+    model_name = "stub"
+    latency = 0.0
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/v1/models":
+            self._send_json(404, {"error": {"message": f"no route {self.path}"}})
+            return
+        self._send_json(
+            200,
+            {"object": "list", "data": [{"id": self.model_name, "object": "model"}]},
+        )
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"no route {self.path}"}})
+            return
+
+        time.sleep(self.latency)
+        messages = request.get("messages", [])
+        text = stub_reply(messages, request.get("max_tokens") or 64)
+        for stop in request.get("stop") or ():
+            text = text.split(stop)[0]
+
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        completion_tokens = len(text.split())
+        self._send_json(
+            200,
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", self.model_name),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "length",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+    def log_message(self, format, *args):
+        # one line per request would drown everything else
+        pass
+
+
+def make_server(host="127.0.0.1", port=8000, model_name="stub", latency=0.0):
+    handler = type(
+        "Handler", (StubHandler,), {"model_name": model_name, "latency": latency}
+    )
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default="stub", help="model name on /v1/models")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every request"
+    )
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.model, args.latency)
+    print(f"Stub server on http://{args.host}:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
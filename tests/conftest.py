@@ -0,0 +1,72 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import torch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# the modules are flat files in the repo root, the benchmarks reuse their
+# tiny-model builders
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def tiny_model():
+    # random 2-layer Llama and a BPE tokenizer trained on the prompts
+    from bench_cpu_inference import build_tokenizer
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    tokenizer = build_tokenizer()
+    tokenizer.pad_token = tokenizer.eos_token
+
+    torch.manual_seed(0)
+    model = LlamaForCausalLM(
+        LlamaConfig(
+            vocab_size=len(tokenizer),
+            hidden_size=64,
+            intermediate_size=128,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            num_key_value_heads=2,
+            bos_token_id=tokenizer.bos_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+        )
+    )
+    model.eval()
+    return model, tokenizer
+
+
+@pytest.fixture
+def greedy_generation(monkeypatch):
+    # deterministic, short and never served from the on-disk cache
+    import model_engine
+    import profiles
+
+    monkeypatch.setattr(profiles, "USE_GENERATION_CACHE", False)
+    monkeypatch.setattr(profiles, "DO_SAMPLE", False)
+    monkeypatch.setattr(
+        profiles,
+        "GENERATION_PROFILES",
+        {
+            role: {**profile, "do_sample": False, "max_new_tokens": 12}
+            for role, profile in profiles.GENERATION_PROFILES.items()
+        },
+    )
+    model_engine.prefix_cache.clear()
+    yield
+    model_engine.prefix_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def stub_url():
+    # stub_server.py in a background thread, on a free port
+    from stub_server import make_server
+
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,56 @@
+import pytest
+
+import backends
+import profiles
+from generation_cache import GenerationCache
+from profiles import count_sentences
+
+PROMPTS = [
+    ("You are a Hero.", "Should you pull the lever?"),
+    ("You are an Egoist.", "Should you report it?"),
+]
+
+
+@pytest.fixture
+def backend(stub_url):
+    profiles.role_stats.clear()
+    backend = backends.OpenAIBackend("stub", base_url=stub_url, max_connections=2)
+    backend.load()
+    yield backend
+    backend.unload()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = GenerationCache(str(tmp_path / "cache.sqlite"), 1024 * 1024)
+    monkeypatch.setattr(backends, "get_generation_cache", lambda: cache)
+    monkeypatch.setattr(profiles, "USE_GENERATION_CACHE", True)
+    return cache
+
+
+def test_responses_are_trimmed_to_the_role_budget(backend):
+    responses = backend.generate_batch(PROMPTS, roles="persona")
+
+    max_sentences = profiles.GENERATION_PROFILES["persona"]["max_sentences"]
+    assert all(0 < count_sentences(r) <= max_sentences for r in responses)
+    assert profiles.role_stats["persona"]["calls"] == len(PROMPTS)
+
+
+def test_unseeded_sampling_skips_the_cache(backend, cache, monkeypatch):
+    monkeypatch.setattr(profiles, "GENERATION_SEED", None)
+
+    backend.generate_batch(PROMPTS, roles="persona")
+    backend.generate_batch(PROMPTS, roles="persona")
+
+    assert cache.hits == cache.misses == 0
+
+
+def test_greedy_responses_are_cached(backend, cache, monkeypatch):
+    monkeypatch.setattr(profiles, "DO_SAMPLE", False)
+
+    first = backend.generate_batch(PROMPTS)
+    second = backend.generate_batch(PROMPTS)
+
+    assert second == first
+    assert cache.hits == len(PROMPTS)
+    assert profiles.role_stats["default"]["cached"] == len(PROMPTS)
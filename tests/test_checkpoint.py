@@ -0,0 +1,45 @@
+import os
+
+from checkpoint import CHECKPOINT_FILE, append_checkpoint, load_checkpoint
+
+
+def crash_mid_write(output_dir, results):
+    # every result written, then the next one cut off halfway
+    for result in results:
+        append_checkpoint(output_dir, result)
+    with open(os.path.join(output_dir, CHECKPOINT_FILE), "a", encoding="utf-8") as f:
+        f.write('{"dilemma_id": 99, "opin')
+
+
+def test_partial_line_is_skipped_without_repair(tmp_path):
+    crash_mid_write(tmp_path, [{"dilemma_id": 1}, {"dilemma_id": 2}])
+
+    assert load_checkpoint(tmp_path) == [{"dilemma_id": 1}, {"dilemma_id": 2}]
+    # reading alone (report.py) leaves the file as it is
+    with open(tmp_path / CHECKPOINT_FILE, encoding="utf-8") as f:
+        assert f.read().endswith('"opin')
+
+
+def test_resume_after_crash_keeps_every_result(tmp_path, capsys):
+    crash_mid_write(tmp_path, [{"dilemma_id": 1}, {"dilemma_id": 2}])
+
+    resumed = load_checkpoint(tmp_path, repair=True)
+    append_checkpoint(tmp_path, {"dilemma_id": 3})
+
+    assert resumed == [{"dilemma_id": 1}, {"dilemma_id": 2}]
+    capsys.readouterr()
+    assert load_checkpoint(tmp_path) == [
+        {"dilemma_id": 1},
+        {"dilemma_id": 2},
+        {"dilemma_id": 3},
+    ]
+    # nothing unreadable is left for later loads to warn about
+    assert "Warning" not in capsys.readouterr().out
+
+
+def test_repair_leaves_complete_files_alone(tmp_path):
+    append_checkpoint(tmp_path, {"dilemma_id": 1})
+    before = (tmp_path / CHECKPOINT_FILE).read_bytes()
+
+    assert load_checkpoint(tmp_path, repair=True) == [{"dilemma_id": 1}]
+    assert (tmp_path / CHECKPOINT_FILE).read_bytes() == before
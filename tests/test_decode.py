@@ -0,0 +1,109 @@
+import torch
+
+from model_engine import decode_new_tokens
+from profiles import count_sentences, trim_response
+from stopping import BudgetStoppingCriteria
+
+PAD = 0
+
+
+class StubTokenizer:
+    """Word-level tokenizer over a fixed vocabulary, id 0 is the pad token."""
+
+    def __init__(self, words):
+        self.vocab = ["<pad>"] + words
+        self.ids = {word: i for i, word in enumerate(self.vocab)}
+        self.pad_token_id = PAD
+
+    def encode(self, text):
+        return [self.ids[word] for word in text.split()]
+
+    def decode(self, ids, skip_special_tokens=False):
+        ids = ids.tolist() if isinstance(ids, torch.Tensor) else ids
+        words = [self.vocab[i] for i in ids if not (skip_special_tokens and i == PAD)]
+        return " ".join(words)
+
+    def batch_decode(self, rows, skip_special_tokens=False):
+        return [self.decode(row, skip_special_tokens) for row in rows]
+
+
+TOKENIZER = StubTokenizer(
+    "system user assistant : be brief . The should help ! Yes no Stop here".split()
+)
+
+
+def encode_rows(rows, width):
+    # left padded, like the batched generate() input
+    return torch.tensor(
+        [[PAD] * (width - len(ids)) + ids for ids in map(TOKENIZER.encode, rows)]
+    )
+
+
+def test_decode_new_tokens_skips_prompt_and_keeps_assistant_in_answer():
+    prompts = encode_rows(["system : be brief user : help assistant :"], 8)
+    answer = torch.tensor([TOKENIZER.encode("The assistant should help .")])
+    outputs = torch.cat([prompts, answer], dim=1)
+
+    decoded = decode_new_tokens(TOKENIZER, outputs, prompts.shape[1])
+
+    # the answer is returned whole, the word "assistant" isn't used as a
+    # marker to cut at
+    assert decoded == ["The assistant should help ."]
+
+
+def test_decode_new_tokens_left_padded_row_ending_in_padding():
+    prompts = encode_rows(["user : help assistant :", "assistant :"], 6)
+    answers = torch.tensor(
+        [
+            TOKENIZER.encode("Yes . Stop here"),
+            # finished early, padded until the rest of the batch was done
+            TOKENIZER.encode("no .") + [PAD, PAD],
+        ]
+    )
+    outputs = torch.cat([prompts, answers], dim=1)
+
+    assert decode_new_tokens(TOKENIZER, outputs, prompts.shape[1]) == [
+        "Yes . Stop here",
+        "no .",
+    ]
+
+
+def test_count_sentences():
+    assert count_sentences("One. Two! Three?") == 3
+    assert count_sentences('He said "stop." Then left') == 1
+    assert count_sentences("3.5 is a number") == 0
+
+
+def test_trim_response_sentences_and_stop_strings():
+    assert trim_response("One. Two. Three.", {"max_sentences": 2}) == "One. Two."
+    assert trim_response("Fine. END more", {"stop_strings": ["END"]}) == "Fine."
+    assert trim_response("  untouched  ", {}) == "untouched"
+
+
+def test_budget_stopping_criteria_rows_stop_independently():
+    profiles = [
+        {"max_new_tokens": 3},
+        {"max_new_tokens": 50, "max_sentences": 1},
+        {"max_new_tokens": 50, "stop_strings": ["Stop"]},
+    ]
+    prompt_len = 2
+    criteria = BudgetStoppingCriteria(TOKENIZER, prompt_len, profiles)
+    prompt = TOKENIZER.encode("user :")
+
+    def step(rows):
+        input_ids = torch.tensor([prompt + TOKENIZER.encode(row) for row in rows])
+        return criteria(input_ids, scores=None).tolist()
+
+    assert step(["Yes", "Yes", "Yes"]) == [False, False, False]
+    assert step(["Yes no", "Yes .", "Yes no"]) == [False, True, False]
+    assert step(["Yes no no", "Yes . no", "Yes no Stop"]) == [True, True, True]
+
+
+def test_budget_stopping_criteria_finished_rows_stay_finished():
+    criteria = BudgetStoppingCriteria(TOKENIZER, 0, [{"max_sentences": 1}])
+
+    assert criteria(torch.tensor([TOKENIZER.encode("Yes .")]), None).tolist() == [True]
+    # later tokens (padding for the rest of the batch) don't reopen the row
+    assert criteria(
+        torch.tensor([TOKENIZER.encode("Yes .") + [PAD]]), None
+    ).tolist() == [True]
@@ -0,0 +1,46 @@
+import pytest
+
+import instrumentation
+import model_engine
+from config import JUDGE_SYSTEM_PROMPT, PERSONAS, SYNTHESIZER_SYSTEM_PROMPT
+
+
+@pytest.fixture
+def metrics():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.enable(False)
+    instrumentation.reset()
+
+
+def histograms(name):
+    return {
+        histogram["labels"]["role"]: histogram
+        for histogram in instrumentation.snapshot()["histograms"]
+        if histogram["name"] == name
+    }
+
+
+def test_mixed_batch_time_is_split_per_role(tiny_model, greedy_generation, metrics):
+    model, tokenizer = tiny_model
+    persona = next(iter(PERSONAS.values()))["system_prompt"]
+    prompts = [
+        (persona, "Should you pull the lever?"),
+        (persona, "Should you report it?"),
+        (SYNTHESIZER_SYSTEM_PROMPT, "Combine the opinions."),
+        (JUDGE_SYSTEM_PROMPT, "Rate the personas."),
+    ]
+    roles = ["persona", "persona", "synthesizer", "judge"]
+
+    model_engine.generate_batch(model, tokenizer, prompts, batch_size=4, roles=roles)
+
+    generate_s = histograms("generate_s")
+    assert set(generate_s) == {"persona", "synthesizer", "judge"}
+    # the shares add up to the one generate() call
+    for role, histogram in generate_s.items():
+        parts = (
+            histograms("prefill_s")[role]["sum"] + histograms("decode_s")[role]["sum"]
+        )
+        assert histogram["sum"] == pytest.approx(parts)
+    assert histograms("batch_size")["judge"]["max"] == 4
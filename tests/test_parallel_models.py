@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import threading
+
+import main
+from config import TEST_DILEMMAS
+from conftest import REPO_ROOT
+
+
+def test_parallel_models_with_chart_workers_return(stub_url, tmp_path, monkeypatch):
+    # each model worker starts its own chart pool, the run used to hang
+    # on exit waiting for them
+    monkeypatch.chdir(tmp_path)
+    models = [
+        (
+            key,
+            {
+                "name": key,
+                "id": "stub",
+                "description": "stub",
+                "backend": "openai",
+                "base_url": stub_url,
+            },
+        )
+        for key in ("stub-a", "stub-b")
+    ]
+    finished = {}
+
+    def run():
+        finished.update(
+            main.run_models_concurrently(
+                models, TEST_DILEMMAS[:1], plot_mode="parallel"
+            )
+        )
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=180)
+
+    assert not thread.is_alive(), "run_models_concurrently did not return"
+    assert set(finished) == {"stub-a", "stub-b"}
+    for data in finished.values():
+        assert len(data["results"]) == 1
+        chart = os.path.join(data["output_dir"], "win_rates.png")
+        assert os.path.exists(chart)
+        # chart workers report back to the model's log, not the terminal
+        with open(os.path.join(data["output_dir"], "run.log"), encoding="utf-8") as f:
+            assert f"Saved: {chart}" in f.read()
+
+
+def test_openai_model_worker_does_not_import_torch(stub_url, tmp_path):
+    # a fresh interpreter, the test process itself has torch loaded
+    model_config = {
+        "name": "stub",
+        "id": "stub",
+        "description": "stub",
+        "backend": "openai",
+        "base_url": stub_url,
+    }
+    script = f"""
+import sys
+import main
+from config import TEST_DILEMMAS
+
+main._run_model_worker(
+    "stub", {model_config!r}, TEST_DILEMMAS[:1], {str(tmp_path)!r},
+    "cpu:0", "off", False, False,
+)
+print("torch" in sys.modules, "transformers" in sys.modules)
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=tmp_path,
+        env=dict(os.environ, PYTHONPATH=str(REPO_ROOT)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.split() == ["False", "False"]
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+import main
+import model_engine
+import profiles
+from backends import HFBackend, InferenceBackend, OpenAIBackend
+from config import TEST_DILEMMAS
+from scheduler import PrioritySemaphore, run_async, run_scheduled
+
+
+@pytest.fixture
+def backend(tiny_model, greedy_generation):
+    backend = HFBackend("tiny", "cpu")
+    backend.model, backend.tokenizer = tiny_model
+    return backend
+
+
+def by_id(completed):
+    return {
+        dilemma["id"]: (opinions, synth_response, judge_verdict)
+        for dilemma, opinions, synth_response, judge_verdict, _ in completed
+    }
+
+
+@pytest.mark.parametrize("use_prefix_cache", [False, True])
+def test_scheduled_matches_sequential(backend, monkeypatch, use_prefix_cache):
+    monkeypatch.setattr(model_engine, "USE_PREFIX_CACHE", use_prefix_cache)
+
+    # a batch size that splits dilemmas across batches
+    scheduled = by_id(run_scheduled(backend, TEST_DILEMMAS, batch_size=5))
+    sequential = by_id(main.run_dilemma(backend, d) for d in TEST_DILEMMAS)
+
+    assert scheduled == sequential
+    assert len(scheduled) == len(TEST_DILEMMAS)
+
+
+def test_scheduled_batches_use_prefix_cache(backend, monkeypatch):
+    monkeypatch.setattr(model_engine, "USE_PREFIX_CACHE", True)
+
+    list(run_scheduled(backend, TEST_DILEMMAS, batch_size=5))
+
+    stats = model_engine.prefix_cache.stats()
+    # one miss per distinct system prompt, every other row is a hit
+    assert stats["misses"] == len(model_engine.prefix_cache.entries)
+    assert stats["hits"] > stats["misses"]
+
+
+def test_prefixed_batch_matches_plain_batch(backend, monkeypatch):
+    prompts = [
+        (persona["system_prompt"], dilemma["description"])
+        for dilemma in TEST_DILEMMAS
+        for persona in main.PERSONAS.values()
+    ]
+
+    monkeypatch.setattr(model_engine, "USE_PREFIX_CACHE", False)
+    plain = backend.generate_batch(prompts, roles="persona")
+    monkeypatch.setattr(model_engine, "USE_PREFIX_CACHE", True)
+    prefixed = backend.generate_batch(prompts, roles="persona")
+
+    assert prefixed == plain
+
+
+def test_priority_semaphore_serves_lowest_priority_first():
+    order = []
+
+    async def worker(slots, priority):
+        async with slots.slot(priority):
+            order.append(priority)
+            await asyncio.sleep(0)
+
+    async def run():
+        slots = PrioritySemaphore(1)
+        await slots.acquire(0)
+        tasks = [
+            asyncio.ensure_future(worker(slots, priority))
+            for priority in [(2, 0), (1, 1), (2, 1), (0, 3), (1, 0)]
+        ]
+        await asyncio.sleep(0)
+        slots.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == [(0, 3), (1, 0), (1, 1), (2, 0), (2, 1)]
+
+
+def test_async_matches_scheduled(stub_url, monkeypatch):
+    monkeypatch.setattr(profiles, "USE_GENERATION_CACHE", False)
+    backend = OpenAIBackend("stub", base_url=stub_url, max_connections=4)
+    backend.load()
+
+    async def collect():
+        return [completed async for completed in run_async(backend, TEST_DILEMMAS, 4)]
+
+    try:
+        scheduled = by_id(run_scheduled(backend, TEST_DILEMMAS))
+        completed = asyncio.run(collect())
+    finally:
+        backend.unload()
+
+    assert by_id(completed) == scheduled
+
+
+def test_cancelled_agenerate_does_not_break_the_batch():
+    class SlowBackend(InferenceBackend):
+        def generate_batch(self, prompts, batch_size=None, roles=None):
+            time.sleep(0.05)
+            return [user for _, user in prompts]
+
+    async def run():
+        backend = SlowBackend()
+        cancelled = asyncio.ensure_future(backend.agenerate("system", "first"))
+        kept = asyncio.ensure_future(backend.agenerate("system", "second"))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        # without the done() check the batch task dies and this never resolves
+        return await asyncio.wait_for(kept, 5)
+
+    assert asyncio.run(run()) == "second"
@@ -0,0 +1,55 @@
+import pytest
+
+import analysis
+from bench_sentiment import make_texts
+
+# the lexicon rules that are easy to get wrong: negation, intensifiers,
+# exclamation marks, emoticons, empty and neutral text
+EDGE_CASES = [
+    "",
+    "The lever is on the left.",
+    "This is good.",
+    "This is not good.",
+    "This is very good!",
+    "This is not very good!!",
+    "I am extremely sad and the outcome is terrible :(",
+    "Great :) but maybe the logic is really flawed...",
+    "I FEEL GREAT, my profit matters and I deserve it!",
+    "However, perhaps we overlook the long-term consequence.",
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_memo():
+    analysis._sentiment_memo.clear()
+    yield
+    analysis._sentiment_memo.clear()
+
+
+def test_pattern_backend_matches_textblob():
+    texts = EDGE_CASES + make_texts(500)
+
+    max_diff = analysis.compare_sentiment_backends(
+        analysis.TextBlobBackend(), analysis.PatternLexiconBackend(), texts
+    )
+
+    assert max_diff == 0.0
+
+
+def test_parallel_scoring_matches_serial(monkeypatch):
+    texts = make_texts(200, seed=1)
+    backend = analysis.PatternLexiconBackend()
+
+    serial = analysis.analyze_sentiments(texts, backend, workers=1)
+    analysis._sentiment_memo.clear()
+    monkeypatch.setattr(analysis, "SENTIMENT_PARALLEL_THRESHOLD", 1)
+    parallel = analysis.analyze_sentiments(texts, backend, workers=2)
+
+    assert parallel == serial
+
+
+def test_memo_returns_copies():
+    first = analysis.analyze_sentiment("This is very good!")
+    first["polarity"] = 0.0
+
+    assert analysis.analyze_sentiment("This is very good!")["polarity"] > 0
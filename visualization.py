@@ -1,119 +1,60 @@
+import contextlib
+import io
+import json
+import multiprocessing
 import os
-import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
 from datetime import datetime
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
+import instrumentation
+from config import PLOT_MODE
 
-from analysis import analyze_persona_response
+# extract_winner lived here before, kept importable for existing callers
+from analysis import annotate_results, extract_winner  # noqa: F401
 
-
-# name normalization
-CANONICAL_NAMES = {
-    "utilitarian": "Utilitarian",
-    "empath": "Empath",
-    "egoist": "Egoist",
-    "futurist": "Futurist",
-    "hero": "Hero",
-    "devilsadvocate": "DevilsAdvocate",
-    "devils": "DevilsAdvocate",
-    "devil": "DevilsAdvocate",
-    "advocate": "DevilsAdvocate",
-}
-
-EXCLUDED_WINNERS = {"synthesizer", "adviser", "advisor", "judge"}
+PLOT_DATA_FILE = "plot_data.json"
 
 
-def normalize_winner_name(raw_name):
-    if not raw_name:
-        return "Unknown"
+def _plotting_modules():
+    # the plotting stack takes seconds to import, so it's only loaded once a
+    # chart is actually drawn (not for data-only or --no-report runs)
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
 
-    # cleanup: no apostrophes, spaces, convert to lowercase
-    cleaned = raw_name.lower().replace("'", "").replace(" ", "").replace("-", "")
+        matplotlib.use("Agg")  # charts are only ever written to files
 
-    for excluded in EXCLUDED_WINNERS:
-        if excluded in cleaned:
-            return "Unknown"
-    if cleaned in CANONICAL_NAMES:
-        return CANONICAL_NAMES[cleaned]
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-    # partial matching for multi-word names ("Devil's Advocate")
-    for key, canonical in CANONICAL_NAMES.items():
-        if key in cleaned or cleaned in key:
-            return canonical
+    return plt, sns
 
-    # fallback to title case of the raw name
-    return raw_name.title()
 
-
-def extract_winner(verdict_text, llm_ratings=None):
-    # WINNER: XXXXXX (capturing everything until newline or REASON)
-    match = re.search(
-        r"WINNER:\s*([A-Za-z'\s]+?)(?:\n|REASON|$)", verdict_text, re.IGNORECASE
-    )
-    if match:
-        winner = normalize_winner_name(match.group(1).strip())
-        if winner != "Unknown":
-            return (winner, False)
-
-    # **Winner: XXXXXX**
-    match = re.search(r"\*\*Winner:\s*([A-Za-z'\s]+?)\*\*", verdict_text, re.IGNORECASE)
-    if match:
-        winner = normalize_winner_name(match.group(1).strip())
-        if winner != "Unknown":
-            return (winner, False)
-
-    # The XXXXXX wins
-    match = re.search(r"The\s+([A-Za-z'\s]+?)\s+wins", verdict_text, re.IGNORECASE)
-    if match:
-        winner = normalize_winner_name(match.group(1).strip())
-        if winner != "Unknown":
-            return (winner, False)
-
-    # XXXXXX argument is strongest
-    match = re.search(
-        r"([A-Za-z'\s]+?)\s+argument\s+is\s+strongest", verdict_text, re.IGNORECASE
-    )
-    if match:
-        winner = normalize_winner_name(match.group(1).strip())
-        if winner != "Unknown":
-            return (winner, False)
-
-    # FALLBACK: extract winner from highest rating if jusge didn't state it individualtly
-    if llm_ratings and isinstance(llm_ratings, dict) and len(llm_ratings) > 0:
-        # Synthesizer is not comptetitor
-        filtered_ratings = {
-            k: v for k, v in llm_ratings.items() if k.lower() not in EXCLUDED_WINNERS
-        }
-        if filtered_ratings:
-            best_persona = max(filtered_ratings, key=filtered_ratings.get)
-            best_score = filtered_ratings[best_persona]
-            # only use fallback if score is > 0
-            if best_score > 0:
-                return (normalize_winner_name(best_persona), True)
-
-    return ("Unknown", False)
-
-
-def plot_win_rates(all_results, output_dir):
+def win_rates_data(all_results):
     win_counts = {}
     fallback_count = 0
     for result in all_results:
-        winner, was_fallback = extract_winner(
-            result.get("judge_verdict", ""), result.get("llm_ratings", {})
-        )
+        winner = result["winner"]
         win_counts[winner] = win_counts.get(winner, 0) + 1
 
-        if was_fallback:
+        if result["winner_fallback"]:
             fallback_count += 1
 
+    return {"win_counts": win_counts, "fallback_count": fallback_count}
+
+
+def render_win_rates(data, output_dir):
+    win_counts = data["win_counts"]
+    fallback_count = data["fallback_count"]
+
     if not win_counts or (len(win_counts) == 1 and "Unknown" in win_counts):
         print(
             "  [!] Could not extract winners from verdicts, skipping win rates chart."
         )
         return
 
+    plt, sns = _plotting_modules()
     fig, ax = plt.subplots(figsize=(10, 6))
 
     personas = list(win_counts.keys())
@@ -149,8 +90,8 @@ def plot_win_rates(all_results, output_dir):
     print(f"  [+] Saved: {filepath}")
 
 
-def plot_controllability_heatmap(all_results, output_dir):
-    data = []
+def controllability_heatmap_data(all_results):
+    rows = []
     dilemma_labels = []
 
     for result in all_results:
@@ -158,13 +99,24 @@ def plot_controllability_heatmap(all_results, output_dir):
         dilemma_labels.append(dilemma_label)
 
         row = {}
-        for persona_name, opinion in result["opinions"].items():
-            analysis = analyze_persona_response(persona_name, opinion)
-            row[persona_name] = analysis["score"]
-        data.append(row)
+        for persona_name, record in result["analysis"].items():
+            row[persona_name] = record["score"]
+        rows.append(row)
+
+    # plain label/persona lists + a score matrix (None where a persona is missing)
+    personas = list(dict.fromkeys(p for row in rows for p in row))
+    scores = [[row.get(p) for p in personas] for row in rows]
+    return {"labels": dilemma_labels, "personas": personas, "scores": scores}
+
 
-    df = pd.DataFrame(data, index=dilemma_labels)
-    fig, ax = plt.subplots(figsize=(18, max(4, len(all_results) * 0.8)))
+def render_controllability_heatmap(data, output_dir):
+    import pandas as pd
+
+    plt, sns = _plotting_modules()
+    df = pd.DataFrame(
+        data["scores"], index=data["labels"], columns=data["personas"], dtype=float
+    )
+    fig, ax = plt.subplots(figsize=(18, max(4, len(df) * 0.8)))
 
     sns.heatmap(
         df,
@@ -193,19 +145,18 @@ def plot_controllability_heatmap(all_results, output_dir):
     print(f"  [+] Saved: {filepath}")
 
 
-def plot_metrics_comparison(all_results, output_dir):
+def metrics_comparison_data(all_results):
     persona_ctrl_scores = {}
     persona_llm_scores = {}
 
     for result in all_results:
-        for persona_name, opinion in result["opinions"].items():
+        for persona_name, record in result["analysis"].items():
             # skip Synthesizer - not supposed to be rated
             if persona_name == "Synthesizer":
                 continue
-            analysis = analyze_persona_response(persona_name, opinion)
             if persona_name not in persona_ctrl_scores:
                 persona_ctrl_scores[persona_name] = []
-            persona_ctrl_scores[persona_name].append(analysis["score"])
+            persona_ctrl_scores[persona_name].append(record["score"])
 
         llm_ratings = result.get("llm_ratings", {})
         for persona_name, rating in llm_ratings.items():
@@ -226,9 +177,18 @@ def plot_metrics_comparison(all_results, output_dir):
         else:
             avg_llm.append(0)
 
+    return {"personas": personas, "avg_ctrl": avg_ctrl, "avg_llm": avg_llm}
+
+
+def render_metrics_comparison(data, output_dir):
+    personas = data["personas"]
+    avg_ctrl = data["avg_ctrl"]
+    avg_llm = data["avg_llm"]
+
     x = range(len(personas))
     width = 0.35
 
+    plt, _ = _plotting_modules()
     fig, ax = plt.subplots(figsize=(12, 6))
 
     bars1 = ax.bar(
@@ -285,16 +245,24 @@ def plot_metrics_comparison(all_results, output_dir):
     print(f"  [+] Saved: {filepath}")
 
 
-def plot_response_lengths(all_results, output_dir):
-    data = []
+def response_lengths_data(all_results):
+    personas = []
+    word_counts = []
     for result in all_results:
-        for persona_name, opinion in result["opinions"].items():
+        for persona_name, record in result["analysis"].items():
             if persona_name == "Synthesizer":
                 continue
-            word_count = len(opinion.split())
-            data.append({"Persona": persona_name, "Word Count": word_count})
+            personas.append(persona_name)
+            word_counts.append(record["word_count"])
+
+    return {"personas": personas, "word_counts": word_counts}
 
-    df = pd.DataFrame(data)
+
+def render_response_lengths(data, output_dir):
+    import pandas as pd
+
+    plt, sns = _plotting_modules()
+    df = pd.DataFrame({"Persona": data["personas"], "Word Count": data["word_counts"]})
 
     fig, ax = plt.subplots(figsize=(12, 6))
 
@@ -321,8 +289,220 @@ def plot_response_lengths(all_results, output_dir):
     print(f"  [+] Saved: {filepath}")
 
 
-def generate_visual_report(all_results, base_output_dir="results", model_key=None):
+def sentiment_data(all_results):
+    persona_polarity = {}
+    persona_subjectivity = {}
+    for result in all_results:
+        for persona_name, record in result["analysis"].items():
+            sentiment = record["sentiment"]
+            persona_polarity.setdefault(persona_name, []).append(sentiment["polarity"])
+            persona_subjectivity.setdefault(persona_name, []).append(
+                sentiment["subjectivity"]
+            )
+
+    personas = list(persona_polarity.keys())
+    polarity = [sum(v) / len(v) for v in persona_polarity.values()]
+    subjectivity = [sum(v) / len(v) for v in persona_subjectivity.values()]
+    return {"personas": personas, "polarity": polarity, "subjectivity": subjectivity}
+
+
+def render_sentiment(data, output_dir):
+    personas = data["personas"]
+    polarity = data["polarity"]
+    subjectivity = data["subjectivity"]
+
+    if not personas:
+        print("  [!] No sentiment data to plot")
+        return
+
+    import numpy as np
+
+    plt, _ = _plotting_modules()
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+
+    colors = plt.cm.Set2(np.linspace(0, 1, len(personas)))
+
+    bars1 = ax1.barh(personas, polarity, color=colors, edgecolor="black", linewidth=1.2)
+    ax1.axvline(x=0, color="gray", linestyle="--", alpha=0.7)
+    ax1.set_xlim(-0.5, 0.5)
+    ax1.set_xlabel("Polarity (-1 = negative, +1 = positive)", fontsize=11)
+    ax1.set_title("Sentiment Polarity by Persona", fontsize=14, fontweight="bold")
 
+    for bar, val in zip(bars1, polarity):
+        ax1.text(
+            val + 0.02,
+            bar.get_y() + bar.get_height() / 2,
+            f"{val:+.2f}",
+            va="center",
+            fontsize=10,
+            fontweight="bold",
+        )
+
+    bars2 = ax2.barh(
+        personas, subjectivity, color=colors, edgecolor="black", linewidth=1.2
+    )
+    ax2.axvline(x=0.5, color="red", linestyle="--", alpha=0.7, label="Neutral (0.5)")
+    ax2.set_xlim(0, 1)
+    ax2.set_xlabel("Subjectivity (0 = objective, 1 = subjective)", fontsize=11)
+    ax2.set_title("Subjectivity by Persona", fontsize=14, fontweight="bold")
+    ax2.legend(loc="lower right")
+
+    for bar, val in zip(bars2, subjectivity):
+        ax2.text(
+            val + 0.02,
+            bar.get_y() + bar.get_height() / 2,
+            f"{val:.2f}",
+            va="center",
+            fontsize=10,
+            fontweight="bold",
+        )
+
+    plt.tight_layout()
+    filepath = os.path.join(output_dir, "sentiment_analysis.png")
+    plt.savefig(filepath, dpi=150)
+    plt.close()
+    print(f"  [+] Saved: {filepath}")
+
+
+def plot_win_rates(all_results, output_dir):
+    render_win_rates(win_rates_data(all_results), output_dir)
+
+
+def plot_controllability_heatmap(all_results, output_dir):
+    render_controllability_heatmap(
+        controllability_heatmap_data(all_results), output_dir
+    )
+
+
+def plot_metrics_comparison(all_results, output_dir):
+    render_metrics_comparison(metrics_comparison_data(all_results), output_dir)
+
+
+def plot_response_lengths(all_results, output_dir):
+    render_response_lengths(response_lengths_data(all_results), output_dir)
+
+
+def plot_sentiment(all_results, output_dir):
+    render_sentiment(sentiment_data(all_results), output_dir)
+
+
+# chart name -> (label used in error messages, data builder, renderer)
+CHARTS = {
+    "win_rates": ("win rates chart", win_rates_data, render_win_rates),
+    "controllability_heatmap": (
+        "heatmap",
+        controllability_heatmap_data,
+        render_controllability_heatmap,
+    ),
+    "metrics_comparison": (
+        "metrics comparison",
+        metrics_comparison_data,
+        render_metrics_comparison,
+    ),
+    "response_lengths": (
+        "response lengths chart",
+        response_lengths_data,
+        render_response_lengths,
+    ),
+    "sentiment": ("sentiment chart", sentiment_data, render_sentiment),
+}
+
+_render_pool = None
+_pending_renders = []
+
+
+def _render_chart(chart, data, output_dir):
+    # returns the render time, recorded by the parent (workers don't share
+    # its instrumentation state)
+    label, _, render = CHARTS[chart]
+    start = time.perf_counter()
+    try:
+        render(data, output_dir)
+    except Exception as e:
+        print(f"  [!] Error generating {label}: {e}")
+    return time.perf_counter() - start
+
+
+def _render_chart_in_worker(chart, data, output_dir):
+    # a worker's stdout is the terminal, not the parent's (possibly
+    # redirected) sys.stdout, so its messages go back with the result and
+    # are printed by the parent
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        seconds = _render_chart(chart, data, output_dir)
+    return seconds, output.getvalue()
+
+
+def _get_render_pool():
+    global _render_pool
+
+    if _render_pool is None:
+        # never fork this process itself: it may have torch/CUDA state and
+        # live threads. a forkserver starts clean, imports the plotting stack
+        # once and forks every worker from there; spawn where it's missing
+        methods = multiprocessing.get_all_start_methods()
+        # workers only write files, and the forkserver inherits this
+        os.environ.setdefault("MPLBACKEND", "Agg")
+        if "forkserver" in methods:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(
+                ["matplotlib", "matplotlib.pyplot", "seaborn", "visualization"]
+            )
+        else:
+            context = multiprocessing.get_context("spawn")
+        _render_pool = ProcessPoolExecutor(max_workers=len(CHARTS), mp_context=context)
+    return _render_pool
+
+
+def shutdown_render_pool():
+    """
+    Stops the chart workers. Needed before a model worker process exits:
+    concurrent.futures only cleans its pools up at exit in the main
+    process, a child would wait for the workers forever.
+    """
+    global _render_pool
+
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=True)
+        _render_pool = None
+
+
+def wait_for_plots():
+    """Blocks until every chart submitted with wait=False has been written."""
+    wait([future for _, future in _pending_renders])
+    for chart, future in _pending_renders:
+        # errors inside a chart come back as output, this only surfaces
+        # crashes of the worker process itself
+        seconds, output = future.result()
+        print(output, end="")
+        instrumentation.observe("plot_s", seconds, chart=chart)
+    _pending_renders.clear()
+
+
+def render_plot_data(output_dir, plot_mode="serial"):
+    """Renders the charts of a run that was saved with plot_mode="later"."""
+    with open(os.path.join(output_dir, PLOT_DATA_FILE), encoding="utf-8") as f:
+        plot_data = json.load(f)
+
+    _render_all(plot_data, output_dir, plot_mode, wait_for_charts=True)
+
+
+def _render_all(plot_data, output_dir, plot_mode, wait_for_charts):
+    if plot_mode == "parallel":
+        pool = _get_render_pool()
+        for chart, data in plot_data.items():
+            _pending_renders.append(
+                (chart, pool.submit(_render_chart_in_worker, chart, data, output_dir))
+            )
+        if wait_for_charts:
+            wait_for_plots()
+    else:
+        for chart, data in plot_data.items():
+            seconds = _render_chart(chart, data, output_dir)
+            instrumentation.observe("plot_s", seconds, chart=chart)
+
+
+def create_output_dir(base_output_dir="results", model_key=None):
     # create timestamped output directory with optional model key
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     if model_key:
@@ -332,6 +512,32 @@ def generate_visual_report(all_results, base_output_dir="results", model_key=Non
 
     output_dir = os.path.join(base_output_dir, folder_name)
     os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+
+def generate_visual_report(
+    all_results,
+    base_output_dir="results",
+    model_key=None,
+    output_dir=None,
+    plot_mode=PLOT_MODE,
+    wait_for_charts=True,
+):
+    """
+    plot_mode:
+        "parallel" - charts render concurrently in worker processes
+        "serial"   - charts render one after another in this process
+        "later"    - only the chart data is saved (render_plot_data renders it)
+        "off"      - no charts at all
+
+    With wait_for_charts=False, parallel charts keep rendering in the
+    background; call wait_for_plots() before exiting.
+    """
+    if output_dir is None:
+        output_dir = create_output_dir(base_output_dir, model_key)
+
+    # no-op for results that were already analyzed
+    annotate_results(all_results)
 
     model_info = f"(Model: {model_key})" if model_key else ""
     print("\n" + "=" * 60)
@@ -339,29 +545,38 @@ def generate_visual_report(all_results, base_output_dir="results", model_key=Non
     print("=" * 60)
     print(f"\nOutput directory: {output_dir}\n")
 
-    # generate each visualization
-    print("Generating charts...")
+    if plot_mode == "off":
+        print("Charts disabled, skipping.")
+        return output_dir
 
-    try:
-        plot_win_rates(all_results, output_dir)
-    except Exception as e:
-        print(f"  [!] Error generating win rates chart: {e}")
+    # only these small aggregates travel to the render processes
+    plot_data = {
+        chart: build_data(all_results) for chart, (_, build_data, _) in CHARTS.items()
+    }
 
-    try:
-        plot_controllability_heatmap(all_results, output_dir)
-    except Exception as e:
-        print(f"  [!] Error generating heatmap: {e}")
+    if plot_mode == "later":
+        filepath = os.path.join(output_dir, PLOT_DATA_FILE)
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(plot_data, f)
+        print(f"Chart data saved for later rendering: {filepath}")
+        return output_dir
 
-    try:
-        plot_metrics_comparison(all_results, output_dir)
-    except Exception as e:
-        print(f"  [!] Error generating metrics comparison: {e}")
+    # generate each visualization
+    print("Generating charts...")
+    _render_all(plot_data, output_dir, plot_mode, wait_for_charts=wait_for_charts)
 
-    try:
-        plot_response_lengths(all_results, output_dir)
-    except Exception as e:
-        print(f"  [!] Error generating response lengths chart: {e}")
+    if not wait_for_charts and plot_mode == "parallel":
+        print("Charts are rendering in the background.")
+        return output_dir
 
     print(f"\n[✓] Visual report complete! See: {output_dir}")
 
     return output_dir
+
+
+if __name__ == "__main__":
+    # renders charts deferred with plot_mode="later":
+    #   python visualization.py results/run_3B_20260203_144258
+    for run_dir in sys.argv[1:]:
+        render_plot_data(run_dir, plot_mode="parallel")
+    shutdown_render_pool()
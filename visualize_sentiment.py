@@ -1,64 +1,24 @@
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
 
-# data from report (3B model)
-personas = [
-    "Utilitarian",
-    "Empath",
-    "Egoist",
-    "Futurist",
-    "Hero",
-    "DevilsAdvocate",
-    "Synthesizer",
-]
+from report import load_run_results
+from visualization import plot_sentiment
 
-polarity = [0.31, 0.09, 0.22, 0.11, 0.20, 0.01, 0.21]
-subjectivity = [0.60, 0.52, 0.63, 0.59, 0.62, 0.53, 0.58]
+# sentiment chart straight from saved runs, written into each run folder:
+#   python visualize_sentiment.py results/run_3B_20260203_144258
 
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
 
-colors = plt.cm.Set2(np.linspace(0, 1, len(personas)))
-
-bars1 = ax1.barh(personas, polarity, color=colors, edgecolor="black", linewidth=1.2)
-ax1.axvline(x=0, color="gray", linestyle="--", alpha=0.7)
-ax1.set_xlim(-0.5, 0.5)
-ax1.set_xlabel("Polarity (-1 = negative, +1 = positive)", fontsize=11)
-ax1.set_title("Sentiment Polarity by Persona", fontsize=14, fontweight="bold")
-
-for bar, val in zip(bars1, polarity):
-    ax1.text(
-        val + 0.02,
-        bar.get_y() + bar.get_height() / 2,
-        f"{val:+.2f}",
-        va="center",
-        fontsize=10,
-        fontweight="bold",
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Plot average sentiment per persona for saved run folders"
     )
+    parser.add_argument("run_dirs", nargs="+", metavar="RUN_DIR")
+    return parser.parse_args()
 
-bars2 = ax2.barh(personas, subjectivity, color=colors, edgecolor="black", linewidth=1.2)
-ax2.axvline(x=0.5, color="red", linestyle="--", alpha=0.7, label="Neutral (0.5)")
-ax2.set_xlim(0, 1)
-ax2.set_xlabel("Subjectivity (0 = objective, 1 = subjective)", fontsize=11)
-ax2.set_title("Subjectivity by Persona", fontsize=14, fontweight="bold")
-ax2.legend(loc="lower right")
 
-for bar, val in zip(bars2, subjectivity):
-    ax2.text(
-        val + 0.02,
-        bar.get_y() + bar.get_height() / 2,
-        f"{val:.2f}",
-        va="center",
-        fontsize=10,
-        fontweight="bold",
-    )
+if __name__ == "__main__":
+    args = parse_args()
 
-plt.tight_layout()
-plt.savefig(
-    "M:/Uni/LM/Project/Persona-Dialectics/results/run_0.5B_20260203_144258/sentiment_analysis.png",
-    dpi=150,
-)
-plt.savefig(
-    "M:/Uni/LM/Project/Persona-Dialectics/sentiment_visualization2.png", dpi=150
-)
-print("Saved: sentiment_visualization.png")
-plt.show()
+    for run_dir in args.run_dirs:
+        run_info, results = load_run_results(run_dir)
+        print(f"\n{run_info['model_config']['name']}: {len(results)} dilemmas")
+        plot_sentiment(results, run_dir)